@@ -1,11 +1,21 @@
+import time
+
 import streamlit as st
+import metrics
 from layout import make_email_container, make_input_container, make_tracking_container
-from db import init_db_connection, get_course_dropdown_data, save_user_info_db
+from db import (
+    init_db_connection,
+    get_departments,
+    get_department_courses,
+    save_user_info_db,
+)
 from helpers import *
 from util import *
 import re
 
 threads = []
+rerun_started = time.perf_counter()
+metrics.configure_from_env()
 
 st.set_page_config(
     page_title="Ubeseat",
@@ -21,11 +31,12 @@ st.write("Real-time alerts and tracking for UBC course availability")
 # Initialize app settings and data
 status = init_session_state(cookie_manager=cookie_manager)
 client = init_db_connection()
-course_dropdown_data = get_course_dropdown_data(client)
 
 # Input Container
 # Contains dropdown menu to select courses to be added to user dashboard
-make_input_container(track_reset_session_state, course_dropdown_data)
+make_input_container(
+    track_reset_session_state, get_departments, get_department_courses, client
+)
 
 st.markdown("---")
 
@@ -57,9 +68,11 @@ if save_email_button:
         response = save_email_to_session_and_cookie(
             st.session_state[cfg.EMAIL_KEY], user_email, client, save_user_info_db
         )
-        if response.acknowledged:
+        if response is not None and response.acknowledged:
             st.success("Email and tracked courses saved!")
 
 # Join any live threads
 # Allows "refresh" to run in a separate thread from app execution, avoiding any pauses
 # join_live_threads(threads, loading_data_spinner)
+
+metrics.registry.observe("app_rerun_seconds", time.perf_counter() - rerun_started)
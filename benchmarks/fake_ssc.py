@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import html
+import os
+import random
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+from parsers import SEAT_LABELS
+
+PATH = "/cs/courseschedule"
+
+
+def get_page_key(query):
+    """
+    Maps a course schedule query to the name of its page (ex: "CPSC-110-101").
+
+    Args:
+        query (Mapping): The query parameters of the request.
+
+    Returns:
+        str: "departments" for the department list, otherwise the dept, course and
+        section codes that are set, joined by dashes.
+    """
+    parts = [query.get(key, "") for key in ("dept", "course", "section")]
+    return "-".join(part for part in parts if part) or "departments"
+
+
+def _link(text, **params):
+    # Escaped like on SSC, otherwise "&sect" in "&section=" reads as an entity
+    href = html.escape(f"{PATH}?" + urlencode(dict(pname="subjarea", **params)))
+    return f'<a href="{href}">{text}</a>'
+
+
+def make_section_page(seats):
+    rows = "".join(
+        f"<tr><td width=200px>{label}{'*' if label.startswith('Restricted') else ''}:</td>"
+        f"<td align=left><strong>{seats[label]}</strong></td></tr>"
+        for label in SEAT_LABELS
+    )
+    return f"<html><body><table class='\\'table'>{rows}</table></body></html>"
+
+
+def generate_catalogue(departments=20, courses=15, sections=6, seed=0):
+    """
+    Generates the pages of a synthetic catalogue in the markup SSC serves.
+
+    Args:
+        departments (int, optional): The number of departments.
+        courses (int, optional): The number of courses per department.
+        sections (int, optional): The number of sections per course.
+        seed (int, optional): Seed of the seat counts and section statuses.
+
+    Returns:
+        dict: The HTML of every page, keyed by page name (see get_page_key).
+    """
+    rng = random.Random(seed)
+    pages = {}
+    dept_codes = [f"D{index:03d}" for index in range(departments)]
+    pages["departments"] = "<html><body><table>{}</table></body></html>".format(
+        "".join(
+            f"<tr><td>{_link(dept, tname='subj-department', dept=dept)}</td></tr>"
+            for dept in dept_codes
+        )
+    )
+    for dept in dept_codes:
+        course_codes = [str(100 + 10 * index) for index in range(courses)]
+        pages[dept] = "<html><body><table>{}</table></body></html>".format(
+            "".join(
+                f"<tr><td>{_link(f'{dept} {course}', tname='subj-course', dept=dept, course=course)}</td></tr>"
+                for course in course_codes
+            )
+        )
+        for course in course_codes:
+            rows = []
+            for index in range(sections):
+                section = f"{101 + index}"
+                registered = rng.randint(0, 200)
+                general = rng.choice([0, 0, rng.randint(1, 20)])
+                restricted = rng.randint(0, 5)
+                status = rng.choice(["", "", "", "Full", "Blocked"]) if not general else ""
+                rows.append(
+                    f"<tr class=section{index % 2 + 1}><td>{status}</td>"
+                    f"<td>{_link(f'{dept} {course} {section}', tname='subj-section', dept=dept, course=course, section=section)}</td>"
+                    "<td>Lecture</td></tr>"
+                )
+                pages[f"{dept}-{course}-{section}"] = make_section_page(
+                    {
+                        "Total Seats Remaining": general + restricted,
+                        "Currently Registered": registered,
+                        "General Seats Remaining": general,
+                        "Restricted Seats Remaining": restricted,
+                    }
+                )
+            pages[f"{dept}-{course}"] = (
+                "<html><body><table class='table table-striped section-summary'>"
+                + "".join(rows)
+                + "</table></body></html>"
+            )
+    return pages
+
+
+def load_recorded_pages(directory):
+    """
+    Loads recorded pages saved as <page name>.html (ex: "CPSC-110-101.html").
+
+    Returns:
+        dict: The HTML of every page, keyed by page name.
+    """
+    pages = {}
+    for filename in os.listdir(directory):
+        name, extension = os.path.splitext(filename)
+        if extension == ".html":
+            with open(os.path.join(directory, filename), "rb") as infile:
+                pages[name] = infile.read()
+    return pages
+
+
+class FakeSSC:
+    """
+    Local stand-in for the SSC course schedule, serving a fixed set of pages with
+    configurable latency, server errors and rate limiting.
+    """
+
+    def __init__(
+        self,
+        pages,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        retry_after=0,
+        seed=0,
+    ):
+        """
+        Args:
+            pages (dict): The HTML of every page, keyed by page name.
+            latency (float, optional): Mean seconds before each response.
+            jitter (float, optional): Maximum seconds added to or removed from the latency.
+            error_rate (float, optional): Share of requests answered with HTTP 503.
+            throttle_rate (float, optional): Share of requests answered with HTTP 429.
+            retry_after (float, optional): Retry-After sent with the 429 responses.
+            seed (int, optional): Seed of the latency and fault injection.
+        """
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "served": 0, "errors": 0, "throttled": 0, "missing": 0}
+
+    async def handle(self, request):
+        self.stats["requests"] += 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.retry_after)})
+        if roll < self.throttle_rate + self.error_rate:
+            self.stats["errors"] += 1
+            return web.Response(status=503)
+
+        page = self.pages.get(get_page_key(request.query))
+        if page is None:
+            self.stats["missing"] += 1
+            page = "<html><body>The requested course is either no longer offered</body></html>"
+        else:
+            self.stats["served"] += 1
+        return web.Response(body=page, content_type="text/html")
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats)
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get(PATH, self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    def serve(self, host="127.0.0.1", port=8765):
+        web.run_app(self.make_app(), host=host, port=port, print=None)
+
+
+def add_fault_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0)
+    parser.add_argument(
+        "--pages", default=None, help="Directory of recorded pages to serve"
+    )
+    parser.add_argument(
+        "--catalogue",
+        type=int,
+        nargs=3,
+        default=(20, 15, 6),
+        metavar=("DEPARTMENTS", "COURSES", "SECTIONS"),
+        help="Size of the synthetic catalogue served without --pages",
+    )
+
+
+def make_server(args):
+    if args.pages:
+        pages = load_recorded_pages(args.pages)
+    else:
+        pages = generate_catalogue(*args.catalogue)
+    return FakeSSC(
+        pages,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the SSC course schedule")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    make_server(args).serve(port=args.port)
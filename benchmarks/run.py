@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import functools
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+import parsers
+from benchmarks.fake_ssc import (
+    PATH,
+    add_fault_arguments,
+    generate_catalogue,
+    load_recorded_pages,
+    make_server,
+)
+from crawler import SSC_Scraper
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _time_calls(func, latencies):
+    """
+    Wraps a sync or async function to append the duration of every call to latencies.
+    """
+    if asyncio.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+    else:
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+    return timed
+
+
+def _get_server_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/stats") as response:
+        return json.load(response)
+
+
+def _make_scraper(base_url, latencies):
+    SSC_Scraper.BASE_URL = base_url + PATH
+    scraper = SSC_Scraper()
+    # Page latency as seen by the crawler, including retries and rate limiting
+    scraper._get_html = _time_calls(scraper._get_html, latencies)
+    scraper._async_get_html = _time_calls(scraper._async_get_html, latencies)
+    return scraper
+
+
+def scenario_all_courses(base_url, options, latencies):
+    scraper = _make_scraper(base_url, latencies)
+    yield
+    asyncio.run(scraper.async_get_all_courses())
+
+
+def _get_items(base_url, options):
+    """
+    Lists the courses of the first departments, to check their availabilities.
+    """
+    scraper = _make_scraper(base_url, [])
+    departments = scraper.get_departments()[: options["items"]]
+    return [course for dept in departments for course in scraper.get_courses(dept=dept)]
+
+
+def scenario_user_availabilities(base_url, options, latencies):
+    items = _get_items(base_url, options)
+    scraper = _make_scraper(base_url, latencies)
+    yield
+    asyncio.run(scraper.async_get_user_availabilities(items))
+
+
+def scenario_user_availabilities_sync(base_url, options, latencies):
+    items = _get_items(base_url, options)
+    scraper = _make_scraper(base_url, latencies)
+    yield
+    scraper.get_user_availabilities(items)
+
+
+def _load_pages(options):
+    if options["pages"]:
+        return load_recorded_pages(options["pages"])
+    return generate_catalogue(*options["catalogue"])
+
+
+def _make_parser_scenario(backend):
+    def scenario(base_url, options, latencies):
+        pages = _load_pages(options)
+        section_pages = [
+            page.encode() if isinstance(page, str) else page
+            for name, page in pages.items()
+            if name.count("-") == 2
+        ]
+        parse_seats = _time_calls(parsers.parse_seats, latencies)
+        yield
+        for _ in range(options["repeat"]):
+            for page in section_pages:
+                parse_seats(page, backend)
+
+    return scenario
+
+
+def scenario_parse_links(base_url, options, latencies):
+    pages = _load_pages(options)
+    listing_pages = [
+        page for name, page in pages.items() if name.count("-") < 2
+    ]
+    parse_links = _time_calls(parsers.parse_links, latencies)
+    pattern = "/cs/courseschedule\\?pname=subjarea.*"
+    yield
+    for _ in range(options["repeat"]):
+        for page in listing_pages:
+            parse_links(page, pattern)
+
+
+# Scenarios are generators: everything before the yield is setup and not measured
+SCENARIOS = {
+    "all_courses": scenario_all_courses,
+    "user_availabilities": scenario_user_availabilities,
+    "user_availabilities_sync": scenario_user_availabilities_sync,
+    **{
+        f"parse_seats[{backend}]": _make_parser_scenario(backend)
+        for backend in parsers.SEAT_PARSERS
+    },
+    "parse_links": scenario_parse_links,
+}
+NETWORK_SCENARIOS = {"all_courses", "user_availabilities", "user_availabilities_sync"}
+
+
+def run_scenario(name, base_url, options):
+    """
+    Runs one scenario and measures it. Meant to run in a fresh process, so that
+    the peak RSS belongs to this scenario alone.
+
+    Returns:
+        dict: The scenario's metrics.
+    """
+    latencies = []
+    scenario = SCENARIOS[name](base_url, options, latencies)
+    next(scenario)
+
+    networked = name in NETWORK_SCENARIOS
+    requests_before = _get_server_stats(base_url)["requests"] if networked else 0
+    started, cpu_started = time.perf_counter(), time.process_time()
+    for _ in scenario:
+        pass
+    elapsed = time.perf_counter() - started
+    cpu_time = time.process_time() - cpu_started
+    requests = (
+        _get_server_stats(base_url)["requests"] - requests_before
+        if networked
+        else len(latencies)
+    )
+
+    pages = max(len(latencies), 1)
+    return {
+        "scenario": name,
+        "pages": len(latencies),
+        "requests": requests,
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "cpu_ms_per_page": cpu_time / pages * 1000,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _wait_for_server(base_url, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return _get_server_stats(base_url)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline crawler benchmarks against a local SSC stand-in"
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        default=list(SCENARIOS),
+        help=f"Scenarios to run, out of {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--items",
+        type=int,
+        default=3,
+        help="Departments whose courses the availability scenarios check",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Passes over the pages in parser scenarios"
+    )
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    options = {
+        "items": args.items,
+        "repeat": args.repeat,
+        "pages": args.pages,
+        "catalogue": args.catalogue,
+    }
+    context = multiprocessing.get_context("spawn")
+    # The server runs in its own process, so its CPU time is not counted
+    server = context.Process(target=make_server(args).serve, kwargs={"port": args.port})
+    server.start()
+    results = []
+    try:
+        _wait_for_server(base_url)
+        for name in args.scenarios:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_scenario, name, base_url, options).result()
+            results.append(result)
+            print(
+                f"{name:<28} {result['pages']:>7} pages {result['requests_per_second']:>9.1f} req/s "
+                f"p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+                f"cpu/page {result['cpu_ms_per_page']:>7.3f} ms  rss {result['peak_rss_mb']:>7.1f} MB",
+                file=sys.stderr,
+            )
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        with open(args.json, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlparse
+
+
+# How long a page stays fresh, in seconds, by SSC page type (the tname parameter)
+DEFAULT_TTLS = {
+    "subj-section": 30,
+    "subj-course": 5 * 60,
+    "subj-department": 6 * 60 * 60,
+    "subj-all-departments": 6 * 60 * 60,
+}
+
+
+def normalize_url(url):
+    """
+    Normalizes an SSC URL into a cache key: lowercase host, sorted query
+    parameters, empty parameters dropped.
+
+    Args:
+        url (str): The URL to normalize.
+
+    Returns:
+        str: The cache key.
+    """
+    parsed = urlparse(url)
+    query = sorted((k, v) for k, v in parse_qsl(parsed.query) if v)
+    return f"{parsed.netloc.lower()}{parsed.path}?{urlencode(query)}"
+
+
+def get_page_type(url):
+    return parse_qs(urlparse(url).query).get("tname", [""])[0]
+
+
+class CacheEntry:
+    __slots__ = ("body", "expires_at", "etag", "last_modified", "parsed")
+
+    def __init__(self, body, expires_at, etag=None, last_modified=None):
+        self.body = body
+        self.expires_at = expires_at
+        # Validators for conditional requests
+        self.etag = etag
+        self.last_modified = last_modified
+        # Parse results of this body, so an unchanged page is never parsed twice
+        self.parsed = {}
+
+    @property
+    def has_validators(self):
+        return self.etag is not None or self.last_modified is not None
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache of SSC page bodies.
+
+    Entries expire according to their page type, and the least recently used ones
+    are evicted once the cache holds more than max_entries pages or max_bytes bytes.
+    Expired entries with an ETag or Last-Modified validator are kept, so that they
+    can be revalidated with a conditional request instead of re-downloaded.
+    """
+
+    def __init__(
+        self,
+        ttls=DEFAULT_TTLS,
+        default_ttl=30,
+        max_entries=10_000,
+        max_bytes=64 * 1024 * 1024,
+    ):
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "revalidations": 0,
+        }
+
+    def get_ttl(self, url):
+        return self.ttls.get(get_page_type(url), self.default_ttl)
+
+    def get(self, url):
+        """
+        Retrieves a fresh page from the cache.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            bytes: The page body, or None if it is not cached or has expired.
+        """
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                if not entry.has_validators:
+                    self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry.body
+
+    def get_entry(self, url):
+        """
+        Retrieves the cached entry of a page, fresh or stale, without touching the
+        hit / miss stats.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            CacheEntry: The entry, or None if the page is not cached.
+        """
+        with self._lock:
+            return self._entries.get(normalize_url(url))
+
+    def set(self, url, body, etag=None, last_modified=None):
+        """
+        Stores a page in the cache, evicting the least recently used pages if needed.
+
+        Args:
+            url (str): The URL of the page.
+            body (bytes): The page body.
+            etag (str, optional): The ETag header of the response.
+            last_modified (str, optional): The Last-Modified header of the response.
+        """
+        ttl = self.get_ttl(url)
+        entry = CacheEntry(body, time.monotonic() + ttl, etag, last_modified)
+        if (ttl <= 0 and not entry.has_validators) or len(body) > self.max_bytes:
+            return
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def revalidate(self, url):
+        """
+        Marks a cached page as fresh again, after the server answered 304 Not Modified.
+
+        Args:
+            url (str): The URL of the page.
+
+        Returns:
+            CacheEntry: The refreshed entry, or None if it was evicted meanwhile.
+        """
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.get_ttl(url)
+                self._entries.move_to_end(key)
+                self.stats["revalidations"] += 1
+            return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every scraper in the process, including across Streamlit sessions
+response_cache = ResponseCache()
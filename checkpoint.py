@@ -0,0 +1,84 @@
+import json
+import os
+
+
+class QueueCheckpoint:
+    """
+    Append-only JSON lines log of a work queue, used to resume it after a crash.
+
+    Every line records one event: an item was queued, finished (with its result) or
+    given up on. Replaying the log gives back the results so far and the items that
+    were queued but never finished. Items given up on are retried when resuming.
+    A queue that drained with nothing given up on is complete: its log is deleted,
+    so the next run with the same path starts afresh.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queued = {}
+        self.results = []
+        self.finished = set()
+        self.dead = set()
+
+        if os.path.exists(path):
+            self._replay()
+        self._outfile = open(path, "a")
+
+    def _replay(self):
+        with open(self.path) as infile:
+            for line in infile:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line may be cut short if the process died mid-write
+                    continue
+                item = record["item"]
+                if record["event"] == "queued":
+                    self.queued[item] = None
+                elif record["event"] == "done":
+                    self.finished.add(item)
+                    key, value = record["result"]
+                    # JSON turns tuple keys (ex: (dept, course)) into lists
+                    self.results.append(
+                        (tuple(key) if isinstance(key, list) else key, value)
+                    )
+                elif record["event"] == "dead":
+                    self.dead.add(item)
+
+    @property
+    def pending(self):
+        """
+        Returns:
+            list: Items queued but not finished, in queue order.
+        """
+        return [item for item in self.queued if item not in self.finished]
+
+    def __contains__(self, item):
+        return item in self.queued
+
+    def _write(self, record):
+        self._outfile.write(json.dumps(record) + "\n")
+        self._outfile.flush()
+
+    def record_queued(self, item):
+        if item not in self.queued:
+            self.queued[item] = None
+            self._write({"event": "queued", "item": item})
+
+    def record_done(self, item, result):
+        self.finished.add(item)
+        self._write({"event": "done", "item": item, "result": result})
+
+    def record_dead(self, item, error):
+        self.dead.add(item)
+        self._write({"event": "dead", "item": item, "error": repr(error)})
+
+    def close(self):
+        self._outfile.close()
+
+    def complete(self):
+        """
+        Closes and deletes the log of a queue that finished every item.
+        """
+        self.close()
+        os.remove(self.path)
@@ -35,6 +35,38 @@ Feel free to reach out to garreth.edderick@gmail.com for any inquiries, suggesti
     # NoSQL database params
     USER_DB = "users"
     USER_TABLE = "profiles"
+    DB_FLUSH_INTERVAL = 5  # seconds between buffered writes
+    COURSE_DB = "courses"
+    DEPARTMENT_TABLE = "departments"  # one document per department
+    LEGACY_COURSE_TREE_TABLE = "course_tree"  # single document, before migration
+    MAX_CACHED_DEPARTMENTS = 64
+    # How often the course pages of a department with an unchanged course listing
+    # are re-read, to find sections added to or removed from existing courses
+    COURSE_RECHECK_INTERVAL = 24 * 60 * MINUTES
+
+    # Background poller params
+    POLL_INTERVAL = 1 * MINUTES
+    NOTIFICATION_SUBJECT = "Ubeseat: seats available in your tracked courses"
+    # Minimum time between two alerts about the same section, if its seats flicker
+    NOTIFICATION_COOLDOWN = 30 * MINUTES
+    POLL_REQUEST_BUDGET = 1.0  # section polls per second, shared by priority
+    # (start datetime, end datetime, budget factor) windows, ex: add / drop periods
+    REGISTRATION_CALENDAR = []
+
+    # Poller sharding params
+    POLLER_DB = "poller"
+    SHARD_LEASE_TABLE = "shard_leases"
+    POLLER_NODE_TABLE = "nodes"
+    SECTION_STATE_TABLE = "section_state"
+    SHARD_COUNT = 16
+    SHARD_LEASE_TTL = 15  # seconds
+
+    # Seat history params
+    HISTORY_DIR = "seat_history"
+    HISTORY_TABLE = "seat_history"
+    # Local history rows are batched, as a chunk per section per poll would not compress
+    HISTORY_FLUSH_ROWS = 50000
+    HISTORY_FLUSH_INTERVAL = 30 * MINUTES
 
 
 cfg = Config()
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+import pymongo
+
+from config import cfg
+from crawler import SSC_Scraper
+from db import save_course_tree
+from models import CourseTree
+
+
+class IncrementalCrawler:
+    """
+    Incrementally refreshes the department -> course -> section tree.
+
+    A fingerprint of every department's course listing and every course's section
+    listing is kept between runs. Only departments whose course listing changed
+    have their course pages read, plus, every recheck_interval, the departments
+    whose course pages were last read longer ago, since sections can be added to
+    existing courses without changing the course listing.
+
+    The tree of the last finished crawl is held as a compact CourseTree, and only
+    the departments that changed are held as dicts until the crawl ends. Progress
+    is checkpointed to disk, and an interrupted crawl resumes with the departments
+    it had not finished.
+    """
+
+    def __init__(
+        self,
+        scraper,
+        checkpoint_path="course_tree_checkpoint.json",
+        recheck_interval=cfg.COURSE_RECHECK_INTERVAL,
+        max_concurrent_departments=10,
+        checkpoint_interval=5.0,
+    ):
+        """
+        Args:
+            scraper (SSC_Scraper): The scraper used to fetch listings.
+            checkpoint_path (str, optional): Where the tree, fingerprints and progress are saved.
+            recheck_interval (float, optional): Seconds after which the course pages
+                of a department are read again even if its course listing did not
+                change. 0 reads them on every run, None never.
+            max_concurrent_departments (int, optional): Departments crawled at once.
+            checkpoint_interval (float, optional): Minimum seconds between checkpoints.
+        """
+        self.scraper = scraper
+        self.checkpoint_path = checkpoint_path
+        self.recheck_interval = recheck_interval
+        self.max_concurrent_departments = max_concurrent_departments
+        self.checkpoint_interval = checkpoint_interval
+
+        self.state = self.load_checkpoint()
+        self._last_checkpoint = 0.0
+
+    @staticmethod
+    def fingerprint(items):
+        """
+        Computes an order-independent fingerprint of a listing.
+
+        Args:
+            items (list): The course numbers or section codes of a page.
+
+        Returns:
+            str: The fingerprint.
+        """
+        return hashlib.sha1("\n".join(sorted(items)).encode()).hexdigest()
+
+    @staticmethod
+    def _empty_diff():
+        return {
+            "added_courses": [],
+            "removed_courses": [],
+            "added_sections": [],
+            "removed_sections": [],
+        }
+
+    def load_checkpoint(self):
+        """
+        Loads the saved state, or an empty one if there is no checkpoint yet.
+
+        Returns:
+            dict: The tree, the listing fingerprints, the departments of the current
+            crawl, those still pending (None when no crawl is in progress), the
+            departments that changed so far and the diff of the current crawl.
+        """
+        state = {
+            "tree": {},
+            "fingerprints": {"departments": {}, "courses": {}, "checked": {}},
+            "departments": [],
+            "pending": None,
+            "changed": {},
+            "diff": self._empty_diff(),
+        }
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as infile:
+                state.update(json.load(infile))
+        state["fingerprints"].setdefault("checked", {})
+        state["tree"] = CourseTree.from_dict(state["tree"])
+        return state
+
+    def save_checkpoint(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self._last_checkpoint = now
+        # Write then rename, so a crash mid-write never corrupts the checkpoint
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as outfile:
+            json.dump(dict(self.state, tree=self.state["tree"].to_dict()), outfile)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _diff_course(self, dept, course, old_sections, new_sections):
+        diff = self.state["diff"]
+        old_sections, new_sections = set(old_sections), set(new_sections)
+        diff["added_sections"] += [
+            f"{dept} {course} {section}" for section in sorted(new_sections - old_sections)
+        ]
+        diff["removed_sections"] += [
+            f"{dept} {course} {section}" for section in sorted(old_sections - new_sections)
+        ]
+
+    def _remove_department(self, dept):
+        fingerprints = self.state["fingerprints"]
+        for course, sections in self.state["tree"].get(dept, {}).items():
+            self.state["diff"]["removed_courses"].append(f"{dept} {course}")
+            self._diff_course(dept, course, sections, [])
+            fingerprints["courses"].pop(f"{dept} {course}", None)
+        fingerprints["departments"].pop(dept, None)
+        fingerprints["checked"].pop(dept, None)
+
+    async def _crawl_course(self, dept, course):
+        sections = await self.scraper.async_get_sections(dept=dept, course=course)
+        return [section.split()[-1] for section in sections]
+
+    async def _crawl_department(self, dept):
+        """
+        Re-crawls a department if its course listing changed or its recheck is due,
+        and keeps its new courses if anything changed since the last run.
+        """
+        tree = self.state["tree"]
+        fingerprints = self.state["fingerprints"]
+
+        courses = await self.scraper.async_get_courses(dept=dept)
+        courses = [course.split()[-1] for course in courses]
+        fingerprint = self.fingerprint(courses)
+        unchanged = dept in tree and fingerprints["departments"].get(dept) == fingerprint
+        # Epoch seconds when the course pages of the department were last read
+        checked_at = fingerprints["checked"].get(dept, 0)
+        recheck = (
+            self.recheck_interval is not None
+            and time.time() - checked_at >= self.recheck_interval
+        )
+
+        if not unchanged or recheck:
+            old_courses = tree.get(dept, {})
+            changed = not unchanged
+            listings = await asyncio.gather(
+                *[self._crawl_course(dept, course) for course in courses]
+            )
+            new_courses = {}
+            for course, sections in zip(courses, listings):
+                key = f"{dept} {course}"
+                course_fingerprint = self.fingerprint(sections)
+                if course not in old_courses:
+                    self.state["diff"]["added_courses"].append(key)
+                if course in old_courses and fingerprints["courses"].get(key) == course_fingerprint:
+                    # Unchanged subtree, kept as is
+                    new_courses[course] = old_courses[course]
+                    continue
+                changed = True
+                self._diff_course(dept, course, old_courses.get(course, []), sections)
+                fingerprints["courses"][key] = course_fingerprint
+                new_courses[course] = sections
+            for course in set(old_courses) - set(new_courses):
+                changed = True
+                self.state["diff"]["removed_courses"].append(f"{dept} {course}")
+                self._diff_course(dept, course, old_courses[course], [])
+                fingerprints["courses"].pop(f"{dept} {course}", None)
+            if changed:
+                self.state["changed"][dept] = new_courses
+            fingerprints["departments"][dept] = fingerprint
+            fingerprints["checked"][dept] = time.time()
+
+        self.state["pending"].remove(dept)
+        self.save_checkpoint()
+
+    async def crawl(self):
+        """
+        Brings the course tree up to date, resuming an interrupted crawl if any.
+
+        Returns:
+            tuple: The course tree (CourseTree) and the diff of this crawl (added /
+            removed courses and sections).
+        """
+        async with self.scraper:
+            if self.state["pending"] is None:
+                departments = await self.scraper.async_get_departments()
+                self.state["diff"] = self._empty_diff()
+                for dept in set(self.state["tree"]) - set(departments):
+                    self._remove_department(dept)
+                self.state["departments"] = list(departments)
+                self.state["pending"] = list(departments)
+                self.state["changed"] = {}
+                self.save_checkpoint(force=True)
+            else:
+                logging.info(
+                    f"Resuming crawl with {len(self.state['pending'])} departments left"
+                )
+
+            semaphore = asyncio.Semaphore(self.max_concurrent_departments)
+
+            async def crawl_department(dept):
+                async with semaphore:
+                    await self._crawl_department(dept)
+
+            try:
+                results = await asyncio.gather(
+                    *[crawl_department(dept) for dept in list(self.state["pending"])],
+                    return_exceptions=True,
+                )
+            finally:
+                # Keep whatever was finished, even if the crawl is interrupted
+                self.save_checkpoint(force=True)
+
+            # Failed departments stay pending, so the next run resumes with them
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                raise errors[0]
+
+        # Rebuilt once, from the old tree and the departments that changed
+        old_tree, changed = self.state["tree"], self.state["changed"]
+        tree = CourseTree()
+        for dept in self.state["departments"]:
+            tree.add_department(
+                dept, changed[dept] if dept in changed else old_tree.get(dept, {})
+            )
+        diff = self.state["diff"]
+        self.state.update(tree=tree, pending=None, changed={})
+        self.save_checkpoint(force=True)
+        return tree, diff
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh the course tree read by the course dropdowns"
+    )
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGO_URI"))
+    parser.add_argument("--checkpoint", default="course_tree_checkpoint.json")
+    parser.add_argument(
+        "--recheck-interval",
+        type=float,
+        default=cfg.COURSE_RECHECK_INTERVAL,
+        help="Seconds after which unchanged departments have their course pages read again",
+    )
+    args = parser.parse_args()
+
+    if not args.mongo_uri:
+        parser.error("--mongo-uri or MONGO_URI is required")
+
+    logging.basicConfig(level=logging.INFO)
+    crawler = IncrementalCrawler(
+        SSC_Scraper(),
+        checkpoint_path=args.checkpoint,
+        recheck_interval=args.recheck_interval,
+    )
+    tree, diff = asyncio.run(crawler.crawl())
+    save_course_tree(pymongo.MongoClient(args.mongo_uri), tree)
+    changes = ", ".join(
+        f"{len(items)} {change.replace('_', ' ')}" for change, items in diff.items()
+    )
+    logging.info(f"Saved {len(tree)} departments ({changes})")
+
+
+if __name__ == "__main__":
+    main()
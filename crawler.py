@@ -1,30 +1,475 @@
 import asyncio
+import contextlib
+import copy
+import functools
 import inspect
 import random
 import re
 import time
 import urllib
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pprint import pprint as print
 
 import logging
 
 import aiohttp
 import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
 
+import metrics
+import parsers
+from cache import ResponseCache, get_page_type
+from checkpoint import QueueCheckpoint
+from models import get_section_name, get_url_codes, intern_code, make_closed_result
+from ratelimit import AdaptiveLimiter
+from transport import LiveTransport
+
+try:
+    import brotli  # noqa: F401 - lets aiohttp / urllib3 decode "br" responses
+except ImportError:
+    brotli = None
+
+ACCEPT_ENCODING = "gzip, br" if brotli is not None else "gzip"
+
 logging.getLogger("asyncio").setLevel(logging.INFO)
 
 
+class RetryableResponseError(Exception):
+    """Raised when SSC answers with a status that is worth retrying (429 / 5xx)."""
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f"SSC responded with HTTP {status}: {url}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for requests made against SSC.
+
+    The first attempt is made immediately. Every following attempt waits a random
+    duration between 0 and min(max_delay, base_delay * 2 ** (failures - 1)), unless
+    the server asked for a specific delay through a Retry-After header.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        max_attempts=10,
+        base_delay=0.5,
+        max_delay=30.0,
+        max_retry_after=120.0,
+        retry_statuses=RETRY_STATUSES,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def get_delay(self, failures, retry_after=None):
+        """
+        Calculates how long to wait before the next attempt.
+
+        Args:
+            failures (int): The number of failed attempts so far.
+            retry_after (float, optional): The delay requested by the server, in seconds.
+
+        Returns:
+            float: The number of seconds to wait.
+        """
+        if failures == 0:
+            return 0.0
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (failures - 1)))
+
+    def should_retry_status(self, status):
+        return status in self.retry_statuses
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        Parses a Retry-After header, given either in seconds or as an HTTP date.
+
+        Args:
+            value (str): The raw header value, or None.
+
+        Returns:
+            float: The requested delay in seconds, or None if it can't be parsed.
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def _timed_call(func, *args):
+    """
+    Calls func(*args) and measures the CPU time it took on the calling thread.
+    Module-level so that it can be sent to a process pool.
+
+    Returns:
+        tuple: The result and the CPU time in seconds.
+    """
+    started = time.thread_time()
+    result = func(*args)
+    return result, time.thread_time() - started
+
+
 class SSC_Scraper:
-    def __init__(self, max_concurrent_tasks=60, retries_per_session=10):
+    # Course schedule endpoint, pointed at a local stand-in by the benchmarks
+    BASE_URL = "https://courses.students.ubc.ca/cs/courseschedule"
+    # Course page statuses that mean no general seat can have opened up
+    CLOSED_SECTION_STATUSES = frozenset({"Full", "Blocked", "Cancelled"})
+
+    def __init__(
+        self,
+        max_concurrent_tasks=60,
+        retries_per_session=10,
+        item_retries=3,
+        retry_policy=None,
+        limiter=None,
+        parser="regex",
+        parse_executor=None,
+        cache=None,
+        connection_limit=100,
+        connection_limit_per_host=30,
+        keepalive_timeout=30,
+        dns_cache_ttl=300,
+        transport=None,
+        metrics_registry=None,
+        profiler=None,
+    ):
         self.max_concurrent_tasks = max_concurrent_tasks
-        self.max_retries_per_session = retries_per_session
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=retries_per_session)
+        # Attempts per queue item before it goes to dead_letters
+        self.item_retries = item_retries
+        self.dead_letters = []
+        # Adapts request rate and concurrency to how SSC is coping
+        self.limiter = limiter or AdaptiveLimiter(max_concurrency=max_concurrent_tasks)
         self.url_regex_base = "/cs/courseschedule\?pname=subjarea"
 
+        if parser not in parsers.SEAT_PARSERS:
+            raise ValueError(
+                f"Unknown parser {parser!r}, expected one of {list(parsers.SEAT_PARSERS)}"
+            )
+        self.parser = parser
+
+        # Optional executor the parse stage runs on, so fetching and parsing overlap
+        if parse_executor not in (None, "thread", "process") and not isinstance(
+            parse_executor, Executor
+        ):
+            raise ValueError(
+                "parse_executor must be None, 'thread', 'process' or an Executor"
+            )
+        self.parse_executor = parse_executor
+        self._executor = None
+
+        # Pooled HTTP client, shared by every request made while the scraper is open
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session = None
+        self._session_depth = 0
+        self.connection_stats = {
+            "created": 0,
+            "reused": 0,
+            "requests": 0,
+            "coalesced": 0,
+        }
+        # In-flight fetches by URL, shared by concurrent callers (single-flight)
+        self._inflight = {}
+        # Pages and their ETag / Last-Modified validators, usually the process-wide
+        # cache.response_cache. Without one, a private cache keeps the validators
+        # for conditional requests but never serves a page without revalidating it
+        self.cache = cache if cache is not None else ResponseCache(ttls={}, default_ttl=0)
+        # Sends the requests: live by default, or recording to / replaying from an
+        # archive (see transport.make_transport)
+        self.transport = transport or LiveTransport()
+        # Per-request phase timings and counters, shared process-wide by default
+        self.metrics = metrics_registry or metrics.registry
+        # Optional profiling.SweepProfiler wrapping every sweep
+        self.profiler = profiler
+        self.reset_sweep_stats()
+
         self.results = {}
 
+    async def __aenter__(self):
+        """
+        Opens the pooled HTTP session. Nested entries share the same session,
+        which is closed when the outermost context exits.
+
+        Returns:
+            SSC_Scraper: The scraper itself.
+        """
+        if self._session_depth == 0:
+            self._session = self._create_session()
+        self._session_depth += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._session_depth -= 1
+        if self._session_depth == 0:
+            await self._session.close()
+            self._session = None
+            self._shutdown_executor()
+
+    def _get_executor(self):
+        """
+        Returns the executor used by the parse stage, creating it on first use.
+
+        Returns:
+            concurrent.futures.Executor: The executor, or None to parse inline.
+        """
+        if isinstance(self.parse_executor, Executor):
+            return self.parse_executor
+        if self._executor is None and self.parse_executor == "process":
+            self._executor = ProcessPoolExecutor()
+        elif self._executor is None and self.parse_executor == "thread":
+            self._executor = ThreadPoolExecutor()
+        return self._executor
+
+    def _shutdown_executor(self):
+        # Executors passed in by the caller are left for the caller to shut down
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_parsed(self, url, html, key):
+        """
+        Looks up a previous parse of this exact page body.
+
+        Returns:
+            tuple: The cache entry holding the body (or None) and the parse result
+            (or None).
+        """
+        entry = self.cache.get_entry(url)
+        if entry is None or entry.body is not html:
+            return None, None
+        result = entry.parsed.get(key)
+        if result is not None:
+            self.sweep_stats["parses_skipped"] += 1
+            self.metrics.inc("parses_skipped")
+            result = copy.copy(result)
+        return entry, result
+
+    def _store_parsed(self, entry, key, result, cpu_time):
+        self.sweep_stats["parse_seconds"] += cpu_time
+        self.metrics.observe("parse_seconds", cpu_time, parser=key[0])
+        if entry is not None:
+            entry.parsed[key] = result
+        return copy.copy(result)
+
+    async def _parse(self, url, func, html, *args):
+        """
+        Runs a parse function from the parsers module, on the parse executor if
+        one is configured. Unchanged pages (cache hits and 304 Not Modified) reuse
+        the previous result without parsing.
+
+        Args:
+            url (str): The URL the page was fetched from.
+            func (callable): A picklable, module-level parse function.
+            html (bytes): The raw page.
+            *args: Further arguments passed to the function.
+
+        Returns:
+            The compact result of the parse function.
+        """
+        key = (func.__name__,) + args
+        entry, result = self._get_parsed(url, html, key)
+        if result is not None:
+            return result
+
+        executor = self._get_executor()
+        if executor is None:
+            result, cpu_time = _timed_call(func, html, *args)
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                result, cpu_time = await loop.run_in_executor(
+                    executor, functools.partial(_timed_call, func, html, *args)
+                )
+            finally:
+                # Outside a sweep context (ex: a standalone async_get_courses call)
+                # no __aexit__ is left to shut the pool down
+                if self._session_depth == 0:
+                    self._shutdown_executor()
+        return self._store_parsed(entry, key, result, cpu_time)
+
+    def _parse_sync(self, url, func, html, *args):
+        """
+        Synchronous counterpart of _parse, always parsing on the calling thread.
+        """
+        key = (func.__name__,) + args
+        entry, result = self._get_parsed(url, html, key)
+        if result is not None:
+            return result
+        result, cpu_time = _timed_call(func, html, *args)
+        return self._store_parsed(entry, key, result, cpu_time)
+
+    def _profile_sweep(self, name):
+        # No profiler, no overhead beyond this check
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.profile(name)
+
+    def reset_sweep_stats(self):
+        """
+        Resets the per-sweep transfer and parse statistics.
+        """
+        self.sweep_stats = {
+            "pages": 0,
+            "not_modified": 0,
+            "bytes_received": 0,
+            "bytes_decoded": 0,
+            "parse_seconds": 0.0,
+            "parses_skipped": 0,
+        }
+
+    def _record_transfer(self, headers, body, not_modified=False):
+        # Content-Length is the size on the wire, before decompression
+        self.sweep_stats["pages"] += 1
+        self.sweep_stats["not_modified"] += not_modified
+        received = headers.get("Content-Length")
+        decoded = 0 if not_modified else len(body)
+        self.sweep_stats["bytes_received"] += (
+            int(received) if received and received.isdigit() else decoded
+        )
+        self.sweep_stats["bytes_decoded"] += decoded
+
+    def _store_response(self, url, response):
+        """
+        Records a fetched page in the sweep stats, and caches it if it is a 200,
+        so that error pages (ex: 403, 404) are not served from the cache.
+
+        Returns:
+            bytes: The page body.
+        """
+        self._record_transfer(response.headers, response.body)
+        if response.status == 200:
+            self.cache.set(
+                url,
+                response.body,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return response.body
+
+    def _get_conditional_headers(self, url):
+        """
+        Generates the request headers, with validators of the cached copy if any.
+
+        Returns:
+            tuple: The headers and the cached entry they were built from.
+        """
+        headers = self._generate_headers()
+        entry = self.cache.get_entry(url)
+        if entry is not None:
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified is not None:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers, entry
+
+    def _record_request(self, url, status, elapsed, trace):
+        """
+        Records the phase timings and status of a request.
+
+        Args:
+            url (str): The URL requested.
+            status (int): The response status, or None if the request failed.
+            elapsed (float): Seconds from sending the request to reading the body.
+            trace (dict): The "connect" and "ttfb" timings, when known.
+        """
+        page_type = get_page_type(url)
+        connect = trace.get("connect", 0.0)
+        ttfb = trace.get("ttfb")
+        if "connect" in trace:
+            self.metrics.observe("connect_seconds", connect, page=page_type)
+        if ttfb is not None:
+            self.metrics.observe("ttfb_seconds", ttfb - connect, page=page_type)
+        if status is not None:
+            self.metrics.observe(
+                "download_seconds", elapsed - (ttfb or 0.0), page=page_type
+            )
+        self.metrics.inc("responses", status=status or "error")
+
+    @contextlib.asynccontextmanager
+    async def _request_slot(self):
+        """
+        Waits for the rate limiter, timing the wait. Replayed pages skip it, so
+        sweeps run at full speed.
+        """
+        if not self.transport.remote:
+            yield
+            return
+        queued = time.perf_counter()
+        async with self.limiter.slot():
+            self.metrics.observe("queue_wait_seconds", time.perf_counter() - queued)
+            yield
+
+    def _create_session(self):
+        """
+        Creates a long-lived client session with a bounded keep-alive connector.
+
+        Returns:
+            aiohttp.ClientSession: The pooled client session.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_connection_create_start.append(self._on_connection_create_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return aiohttp.ClientSession(
+            connector=connector, trace_configs=[trace_config]
+        )
+
+    # The timings dict of a request is passed as its trace_request_ctx
+    async def _on_request_start(self, session, context, params):
+        self.connection_stats["requests"] += 1
+        context.started = time.perf_counter()
+
+    async def _on_request_end(self, session, context, params):
+        # Fired once the response headers are in: time to first byte
+        if isinstance(context.trace_request_ctx, dict):
+            context.trace_request_ctx["ttfb"] = time.perf_counter() - context.started
+
+    async def _on_connection_create_start(self, session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def _on_connection_create_end(self, session, context, params):
+        self.connection_stats["created"] += 1
+        if isinstance(context.trace_request_ctx, dict):
+            context.trace_request_ctx["connect"] = (
+                time.perf_counter() - context.connect_started
+            )
+
+    async def _on_connection_reuseconn(self, session, context, params):
+        self.connection_stats["reused"] += 1
+
     def get_regex_pattern(self, **kwargs):
         url_params = [f"{k}={v}" for k, v in kwargs.items()]
         return ".*".join([self.url_regex_base] + url_params) + ".*"
@@ -37,7 +482,10 @@ class SSC_Scraper:
         Returns:
             dict: The headers for the API request.
         """
-        return {"User-Agent": f"Mozilla {random.randint(1,6)}.0"}
+        return {
+            "User-Agent": f"Mozilla {random.randint(1,6)}.0",
+            "Accept-Encoding": ACCEPT_ENCODING,
+        }
 
     @staticmethod
     def _format_urls_to_text(urls):
@@ -54,21 +502,9 @@ class SSC_Scraper:
             map(lambda url: re.sub('<.*"?>', "", re.sub('<.*">', "", str(url))), urls)
         )
 
-    @staticmethod
-    def get_sleep_duration(consecutive_retries):
-        """
-        Calculates the sleep duration for retrying an operation based on the number of current retries.
-
-        Args:
-            consecutive_retries (int): The number of current retries.
-
-        Returns:
-            float: The calculated sleep duration.
-        """
-        return 3 * (float(consecutive_retries) / 2) + 2
-
-    @staticmethod
+    @classmethod
     def make_url(
+        cls,
         sesscd="W",
         sessyr=str(datetime.now().year),
         campuscd="UBC",
@@ -99,7 +535,7 @@ class SSC_Scraper:
         else:
             tname = "subj-all-departments"
 
-        base_url = f"https://courses.students.ubc.ca/cs/courseschedule?"
+        base_url = f"{cls.BASE_URL}?"
         url_params = dict(pname="subjarea", tname=tname)
 
         frame = inspect.currentframe()
@@ -133,57 +569,60 @@ class SSC_Scraper:
         """
         self.results = {}
 
-    async def _async_get_urls_from_itemlist(self, item_list):
+    async def _async_get_urls_from_itemlist(self, item_list, course_pages=None):
         """
-        Populate the queue with URLs based on the given item list.
+        Asynchronously expands the given items into section URLs.
+
+        Departments and courses are expanded through async_get_courses and
+        async_get_sections, with at most max_concurrent_tasks expansions in flight.
 
         Parameters:
-            queue (Queue): The queue to populate with URLs.
             item_list (List[str]): The list of items to process.
+            course_pages (dict, optional): Where the course pages read to expand
+                courses are stored, by URL.
 
         Returns:
-            List[str]: The list of objects added to the queue.
+            List[str]: The de-duplicated list of section URLs, in item order.
 
         Raises:
-            Exception: If an unknown or invalid URL is passed into the function.
+            Exception: If an unknown or invalid item is passed into the function.
         """
+        semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
 
-        tasks = []
-
-        for item in item_list:
+        async def expand(item):
             item_split = item.split()
 
             # Base Case - scrape a specific section of a specific course (ex: PHIL 220 99A)
             if len(item_split) == 3:
                 dept, course, section = item_split
-                url = SSC_Scraper.make_url(dept=dept, course=course, section=section)
-                future_object = asyncio.Future()
-                future_object.set_result(url)
-                tasks += [future_object]
+                return [SSC_Scraper.make_url(dept=dept, course=course, section=section)]
 
             # Recursive Case #1 - scrape all courses and sections (ex: BIOL)
             elif len(item_split) == 1:
                 dept = item_split[0]
-                course = section = ""
-                courses = self.get_courses(dept=dept, course=course, section=section)
-                tasks += [
-                    asyncio.create_task(self._async_get_urls_from_itemlist(courses))
-                ]
+                async with semaphore:
+                    children = await self.async_get_courses(dept=dept)
 
             # Recursive Case #2 - scrape all sections of a course (ex: CPSC 110)
             elif len(item_split) == 2:
                 dept, course = item_split
-                section = ""
-                sections = self.get_sections(dept=dept, course=course, section=section)
-                tasks += [
-                    asyncio.create_task(self._async_get_urls_from_itemlist(sections))
-                ]
+                async with semaphore:
+                    children = await self.async_get_sections(
+                        pages=course_pages, dept=dept, course=course
+                    )
 
-            # Raise error - invalid URL
+            # Raise error - invalid item
             else:
-                raise Exception(f"Unknown / Invalid URL passed into function: {url}")
-        results = await asyncio.gather(*tasks)
-        return results
+                raise Exception(f"Unknown / Invalid item passed into function: {item}")
+
+            # The semaphore is released before recursing, so nested expansions
+            # can't deadlock waiting on their parents
+            nested = await asyncio.gather(*[expand(child) for child in children])
+            return [url for urls in nested for url in urls]
+
+        async with self:
+            nested = await asyncio.gather(*[expand(item) for item in item_list])
+        return list(dict.fromkeys(url for urls in nested for url in urls))
 
     def _get_urls_from_itemlist(self, item_list, mode="default"):
         """
@@ -228,6 +667,9 @@ class SSC_Scraper:
             else:
                 raise Exception(f"Unknown / Invalid URL passed into function: {url}")
 
+        # The same section can be reached through several items
+        objects = list(dict.fromkeys(objects))
+
         if mode == "all":
             return (all_courses, objects)
         return objects
@@ -247,22 +689,18 @@ class SSC_Scraper:
             Exception: If no URLs matching the pattern are found.
 
         Returns:
-            list: A list of BeautifulSoup objects representing the URLs.
+            list: A list of link texts matching the pattern.
         """
         page = self._get_html(url)
-        soup = BeautifulSoup(page, "html.parser")
-        objs = soup.find_all("a", href=re.compile(pattern))
+        objs = self._parse_sync(url, parsers.parse_links, page, pattern)
 
-        if (
-            "The requested course is either no longer offered" in soup.get_text()
-            or len(objs) == 0
-        ):
+        if len(objs) == 0:
+            self.metrics.inc("not_offered_pages")
             print(f"Course / Department not offered this term: {url}")
-            return []
 
         return objs
 
-    async def _async_get_urls_from_page(self, url, pattern, start=0, end=None):
+    async def _async_get_urls_from_page(self, url, pattern, start=0, end=None, pages=None):
         """
         Asynchronously retrieves the URLs from a given web page that match a specified pattern.
 
@@ -271,24 +709,23 @@ class SSC_Scraper:
             pattern (str): The regular expression pattern to match against the href attributes of the <a> tags.
             start (int, optional): The starting index of the objects to retrieve. Defaults to 0.
             end (int, optional): The ending index of the objects to retrieve. Defaults to None.
+            pages (dict, optional): Where the fetched page is also stored, by URL.
 
         Raises:
             Exception: If the web page indicates that the course is no longer offered this term.
             Exception: If no objects are found that match the specified pattern.
 
         Returns:
-            list: A list of objects that match the specified pattern.
+            list: A list of link texts matching the pattern.
         """
         page = await self._async_get_html(url)
-        soup = BeautifulSoup(page, "html.parser")
-        objs = soup.find_all("a", href=re.compile(pattern))
+        if pages is not None:
+            pages[url] = page
+        objs = await self._parse(url, parsers.parse_links, page, pattern)
 
-        if (
-            "The requested course is either no longer offered" in soup.get_text()
-            or len(objs) == 0
-        ):
+        if len(objs) == 0:
+            self.metrics.inc("not_offered_pages")
             print(f"Course / Department is not offered this term: {url}")
-            return []
 
         return objs
 
@@ -302,51 +739,144 @@ class SSC_Scraper:
         Returns:
             bytes: The HTML content of the URL as bytes.
         """
-        # Add retry logic
-        consecutive_retries = 0
-        curr_sleep = self.get_sleep_duration(consecutive_retries)
-        while consecutive_retries < self.max_retries_per_session:
-            time.sleep(curr_sleep)
+        html = self.cache.get(url)
+        if html is not None:
+            self.metrics.inc("cache_hits")
+            return html
+
+        failures = 0
+        retry_after = None
+        while failures < self.retry_policy.max_attempts:
+            delay = self.retry_policy.get_delay(failures, retry_after)
+            if delay:
+                time.sleep(delay)
+            started = time.perf_counter()
+            status = None
+            trace = {}
             try:
-                response = requests.get(url, headers=self._generate_headers())
-                consecutive_retries = 0
-                return response.content
-            except requests.exceptions.ConnectionError:
-                consecutive_retries += 1
+                headers, entry = self._get_conditional_headers(url)
+                response = self.transport.fetch(url, headers, trace)
+                status = response.status
+                if response.status == 304 and entry is not None:
+                    self._record_transfer(response.headers, b"", not_modified=True)
+                    self.cache.revalidate(url)
+                    return entry.body
+                if self.retry_policy.should_retry_status(response.status):
+                    raise RetryableResponseError(
+                        url,
+                        response.status,
+                        RetryPolicy.parse_retry_after(
+                            response.headers.get("Retry-After")
+                        ),
+                    )
+                return self._store_response(url, response)
+            except RetryableResponseError as error:
+                failures += 1
+                retry_after = error.retry_after
+                self.metrics.inc("retries")
+            except requests.exceptions.RequestException:
+                failures += 1
+                retry_after = None
+                self.metrics.inc("retries")
+            finally:
+                self._record_request(url, status, time.perf_counter() - started, trace)
         raise Exception(f"Maximum retries exceeded in {url}.")
 
     async def _async_get_html(self, url, show_print=False):
         """
         Asynchronously retrieves the HTML content from the specified URL.
 
+        Pages still fresh in the response cache are returned without a request, and
+        concurrent calls for the same URL share a single in-flight request.
+
+        Args:
+            url (str): The URL to retrieve the HTML content from.
+            show_print (bool, optional): Whether to print debug information. Defaults to False.
+
+        Returns:
+            bytes: The raw HTML content.
+
+        Raises:
+            Exception: If the maximum number of retries is reached.
+        """
+        html = self.cache.get(url)
+        if html is not None:
+            self.metrics.inc("cache_hits")
+            return html
+
+        future = self._inflight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._async_fetch_html(url, show_print))
+            self._inflight[url] = future
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        else:
+            self.connection_stats["coalesced"] += 1
+            self.metrics.inc("coalesced_requests")
+        # Shielded so that one cancelled caller doesn't cancel the others
+        return await asyncio.shield(future)
+
+    async def _async_fetch_html(self, url, show_print=False):
+        """
+        Fetches the HTML content from the specified URL, retrying as per retry_policy.
+
         Args:
             url (str): The URL to retrieve the HTML content from.
             show_print (bool, optional): Whether to print debug information. Defaults to False.
 
         Returns:
-            str: The retrieved HTML content.
+            bytes: The raw HTML content.
 
         Raises:
             Exception: If the maximum number of retries is reached.
         """
-        # Add retry logic
-        consecutive_retries = 0
-        # Sleep duration increases after each retry
-        curr_sleep = self.get_sleep_duration(consecutive_retries)
-        while consecutive_retries < self.max_retries_per_session:
-            await asyncio.sleep(curr_sleep)
+        failures = 0
+        retry_after = None
+        while failures < self.retry_policy.max_attempts:
+            # No delay on the first attempt, jittered backoff afterwards
+            delay = self.retry_policy.get_delay(failures, retry_after)
+            if delay:
+                await asyncio.sleep(delay)
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        url, headers=self._generate_headers()
-                    ) as response:
-                        html = await response.text()
-                        return html
-            except aiohttp.ClientError as client_error:
-                consecutive_retries += 1
+                async with self, self._request_slot():
+                    started = time.perf_counter()
+                    status = None
+                    trace = {}
+                    try:
+                        headers, entry = self._get_conditional_headers(url)
+                        response = await self.transport.async_fetch(
+                            self._session, url, headers, trace
+                        )
+                        status = response.status
+                        # Unchanged since the cached copy: skip parsing
+                        if status == 304 and entry is not None:
+                            self._record_transfer(response.headers, b"", not_modified=True)
+                            self.cache.revalidate(url)
+                            return entry.body
+                        if self.retry_policy.should_retry_status(status):
+                            raise RetryableResponseError(
+                                url,
+                                status,
+                                RetryPolicy.parse_retry_after(
+                                    response.headers.get("Retry-After")
+                                ),
+                            )
+                        return self._store_response(url, response)
+                    finally:
+                        elapsed = time.perf_counter() - started
+                        self._record_request(url, status, elapsed, trace)
+                        if self.transport.remote:
+                            self.limiter.record(elapsed, status)
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                RetryableResponseError,
+            ) as error:
+                failures += 1
+                retry_after = getattr(error, "retry_after", None)
+                self.metrics.inc("retries")
                 if show_print:
                     logging.warning(
-                        f"Client Error! Trying to use retry {consecutive_retries} out of {self.max_retries_per_session}"
+                        f"{error!r}. Trying to use retry {failures} out of {self.retry_policy.max_attempts}"
                     )
         raise Exception(f"Maximum retries exceeded in {url}")
 
@@ -354,24 +884,9 @@ class SSC_Scraper:
         html = self._get_html(url)
 
         # Get Course Name
-        query = urlparse(url).query
-        parsed_query = parse_qs(query)
-        course_name = f"{parsed_query['dept'][0]} {parsed_query['course'][0]} {parsed_query['section'][0]}"
-
-        soup = BeautifulSoup(html, "html.parser")
-        nums = []
-        labels = [
-            "Total Seats Remaining",
-            "Currently Registered",
-            "General Seats Remaining",
-            "Restricted Seats Remaining",
-        ]
-        for item in soup.find_all("strong"):
-            try:
-                nums.append(int(item.text))
-            except ValueError as e:
-                continue
-        seats = {label: num for label, num in zip(labels, nums)}
+        course_name = get_section_name(url)
+
+        seats = self._parse_sync(url, parsers.parse_seats, html, self.parser)
 
         return (course_name, seats)
 
@@ -390,6 +905,23 @@ class SSC_Scraper:
 
         return depts
 
+    async def async_get_departments(self, **kwargs):
+        """
+        Retrieves a list of departments from the course schedule website asynchronously.
+
+        :return: A list of department names.
+        """
+        url = SSC_Scraper.make_url()
+        course_urls = await self._async_get_urls_from_page(
+            url, self.get_regex_pattern(**kwargs)
+        )
+        depts = SSC_Scraper._format_urls_to_text(course_urls)
+
+        if len(depts) == 0:
+            raise Exception("Request rejected by SSC")
+
+        return depts
+
     def get_courses(self, **kwargs):
         """
         Retrieves a list of courses from the given URL.
@@ -454,12 +986,13 @@ class SSC_Scraper:
 
         return sections
 
-    async def async_get_sections(self, **kwargs):
+    async def async_get_sections(self, pages=None, **kwargs):
         """
         Retrieves the sections from a given URL.
 
         Parameters:
             url (str): The URL to retrieve the sections from.
+            pages (dict, optional): Where the course page is also stored, by URL.
 
         Returns:
             list: A list of sections retrieved from the URL.
@@ -472,13 +1005,17 @@ class SSC_Scraper:
 
         url = SSC_Scraper.make_url(**kwargs)
         section_urls = await self._async_get_urls_from_page(
-            url, self.get_regex_pattern(**kwargs)
+            url, self.get_regex_pattern(**kwargs), pages=pages
         )
         sections = SSC_Scraper._format_urls_to_text(section_urls)
 
         return sections
 
     def update_results(self, result):
+        with self.metrics.timer("result_merge_seconds"):
+            self._merge_result(result)
+
+    def _merge_result(self, result):
         if isinstance(self.results, dict) and isinstance(result, tuple):
             key, value = result
             if isinstance(key, tuple):
@@ -489,120 +1026,331 @@ class SSC_Scraper:
         else:
             raise ValueError("Invalid argument and results initialization")
 
-    async def worker(self, queue, semaphore, task):
-        while True:
-            async with semaphore:
-                try:
-                    await asyncio.sleep(random.random())
-                    result = await task(queue)
-                    self.update_results(result)
-                    # Get new task from queue
-                    queue.task_done()
-                except Exception as error:
-                    print(error)
-                    print("Exiting worker...")
-                    break
-
-    async def async_queue_tasks(self, queue_items, task):
-        queue = asyncio.Queue()
-        sem = asyncio.Semaphore(self.max_concurrent_tasks)
-
-        try:
-            # Create MAX_CONCURRENT_TASKS number of workers
-            tasks = [
-                asyncio.create_task(self.worker(queue=queue, semaphore=sem, task=task))
-                for _ in range(self.max_concurrent_tasks)
-            ]
+    async def worker(self, queue, task, enqueue, attempts, results, checkpoint=None):
+        """
+        Processes queue items until cancelled. Failed items are re-queued until
+        they run out of retries, then moved to self.dead_letters.
 
-            for item in queue_items:
-                await queue.put(item)
+        Args:
+            queue (asyncio.Queue): The queue of items to process.
+            task (callable): Coroutine function called as task(item, enqueue).
+            enqueue (callable): Adds a new item to the queue.
+            attempts (dict): Failed attempts so far, by item.
+            results (asyncio.Queue): Bounded queue the task results are put on.
+            checkpoint (QueueCheckpoint, optional): Log of finished and dead items.
+        """
+        # Requests made by the task are paced by self.limiter
+        while True:
+            item = await queue.get()
+            try:
+                result = await task(item, enqueue)
+                # Blocks while the consumer is behind, bounding memory
+                await results.put(result)
+                if checkpoint is not None:
+                    checkpoint.record_done(item, result)
+            except Exception as error:
+                attempts[item] = attempts.get(item, 0) + 1
+                if attempts[item] < self.item_retries:
+                    logging.warning(
+                        f"{error!r} on {item}, retry {attempts[item]} out of {self.item_retries}"
+                    )
+                    # Re-queued before task_done, so queue.join() keeps waiting for it
+                    queue.put_nowait(item)
+                else:
+                    logging.error(f"Giving up on {item}: {error!r}")
+                    self.dead_letters.append((item, error))
+                    if checkpoint is not None:
+                        checkpoint.record_dead(item, error)
+            finally:
+                queue.task_done()
+
+    async def _async_iter_tasks(self, queue_items, task, checkpoint_path=None):
+        """
+        Runs a task over every queue item with a pool of workers, yielding each
+        result as soon as it is ready.
 
+        Args:
+            queue_items (list): The initial items.
+            task (callable): Coroutine function called as task(item, enqueue). It
+                returns a result and may enqueue new items.
+            checkpoint_path (str, optional): JSON lines file recording queued and
+                finished items. If it already exists, finished results are yielded
+                first and only unfinished items are processed. It is deleted once
+                every item finished, and kept if any was given up on.
+
+        Yields:
+            The task results, in completion order.
+        """
+        queue = asyncio.Queue()
+        results = asyncio.Queue(maxsize=self.max_concurrent_tasks)
+        attempts = {}
+        self.dead_letters = []
+        checkpoint = QueueCheckpoint(checkpoint_path) if checkpoint_path else None
+
+        seen = set()
+
+        def enqueue(item):
+            if item in seen:
+                return
+            seen.add(item)
+            if checkpoint is not None:
+                checkpoint.record_queued(item)
+            queue.put_nowait(item)
+
+        restored = []
+        if checkpoint is not None:
+            restored = checkpoint.results
+            # Resume with what was left unfinished, before any new items
+            seen.update(checkpoint.queued)
+            for item in checkpoint.pending:
+                queue.put_nowait(item)
+        for item in queue_items:
+            enqueue(item)
+
+        workers = set()
+        stopping = False
+        drained = False
+        finished = object()
+
+        def spawn_worker():
+            worker = asyncio.create_task(
+                self.worker(queue, task, enqueue, attempts, results, checkpoint)
+            )
+            workers.add(worker)
+            worker.add_done_callback(on_worker_done)
+
+        def on_worker_done(worker):
+            workers.discard(worker)
+            if stopping or worker.cancelled():
+                return
+            # A worker only stops on an unexpected error; replace it
+            logging.error(f"Worker crashed, starting a replacement: {worker.exception()!r}")
+            spawn_worker()
+
+        async def wait_until_finished():
             # Wait for queue to finish all jobs
             await queue.join()
+            await results.put(finished)
 
-            # Cancel all workers
-            for task in tasks:
-                task.cancel()
-
-            # Wait for all tasks to be cancelled
-            s = await asyncio.gather(*tasks, return_exceptions=True)
-            return self.results
-
-        except Exception as e:
-            print(f"Stopping workers due to exception: {e}")
+        try:
+            # Keep one pooled session open for the whole queue
+            async with self:
+                for result in restored:
+                    yield result
+
+                # Create MAX_CONCURRENT_TASKS number of workers; the adaptive
+                # limiter decides how many of them may have a request in flight
+                for _ in range(self.max_concurrent_tasks):
+                    spawn_worker()
+                waiter = asyncio.create_task(wait_until_finished())
+                workers.add(waiter)
+
+                while True:
+                    result = await results.get()
+                    if result is finished:
+                        drained = True
+                        break
+                    yield result
+        finally:
+            stopping = True
+            # Cancel all workers and wait for them to stop
+            for worker in list(workers):
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if checkpoint is not None:
+                if drained and not self.dead_letters:
+                    checkpoint.complete()
+                else:
+                    checkpoint.close()
+
+    async def async_queue_tasks(self, queue_items, task, checkpoint_path=None):
+        """
+        Runs a task over every queue item and merges the results into self.results.
 
-    async def _async_save_all_courses(self, queue):
-        url = await queue.get()
+        Args:
+            queue_items (list): The initial items.
+            task (callable): Coroutine function called as task(item, enqueue).
+            checkpoint_path (str, optional): See _async_iter_tasks.
 
-        query = urlparse(url).query
-        parsed_query = parse_qs(query)
-        dept = parsed_query["dept"][0]
+        Returns:
+            dict: The results.
+        """
+        async for result in self._async_iter_tasks(queue_items, task, checkpoint_path):
+            self.update_results(result)
+        return self.results
 
-        course = parsed_query.get("course", [""])[0]
+    async def _async_save_all_courses(self, url, enqueue):
+        dept, course, _ = get_url_codes(url)
 
         if course == "":
             courses = await self.async_get_courses(dept=dept)
             # Get only the course number
-            courses = {course.split()[-1]: [] for course in courses}
+            courses = {intern_code(course.split()[-1]): [] for course in courses}
             # Update queue with new courses
             for course in courses:
                 course_url = self.make_url(dept=dept, course=course)
-                queue.put_nowait(course_url)
+                enqueue(course_url)
 
             return (dept, courses)
 
         else:
             sections = await self.async_get_sections(dept=dept, course=course)
-            sections = [section.split()[-1] for section in sections]
+            sections = [intern_code(section.split()[-1]) for section in sections]
             return ((dept, course), sections)
 
-    async def async_extract_available_seats(self, queue):
-        url = await queue.get()
+    async def async_extract_available_seats(self, url, enqueue=None):
         html = await self._async_get_html(url)
 
         # Get Course Name
-        query = urlparse(url).query
-        parsed_query = parse_qs(query)
-        course_name = f"{parsed_query['dept'][0]} {parsed_query['course'][0]} {parsed_query['section'][0]}"
-
-        soup = BeautifulSoup(html, "html.parser")
-        nums = []
-        labels = [
-            "Total Seats Remaining",
-            "Currently Registered",
-            "General Seats Remaining",
-            "Restricted Seats Remaining",
-        ]
-        for item in soup.find_all("strong"):
-            try:
-                nums.append(int(item.text))
-            except ValueError as e:
-                continue
-        seats = {label: num for label, num in zip(labels, nums)}
+        course_name = get_section_name(url)
+
+        seats = await self._parse(url, parsers.parse_seats, html, self.parser)
 
         return (course_name, seats)
 
-    async def async_get_all_courses(self):
-        departments = self.get_departments()
-        department_urls = [self.make_url(dept=dept) for dept in departments]
-        results = await self.async_queue_tasks(
-            department_urls, self._async_save_all_courses
-        )
+    async def async_get_all_courses(self, checkpoint_path=None):
+        self.reset_sweep_stats()
+        with self._profile_sweep("all_courses"):
+            async with self:
+                departments = await self.async_get_departments()
+                department_urls = [self.make_url(dept=dept) for dept in departments]
+                results = await self.async_queue_tasks(
+                    department_urls, self._async_save_all_courses, checkpoint_path
+                )
+        logging.info(f"Sweep stats: {self.sweep_stats}")
         return results
 
-    async def async_get_user_availabilities(self, queue_items, show_unavailable=True):
-        urls = self._get_urls_from_itemlist(queue_items)
-        results = await self.async_queue_tasks(urls, self.async_extract_available_seats)
-        if show_unavailable:
-            return results
-        # Only show sections with availabilities
-        return {k: v for k, v in results.items() if v["General Seats Remaining"] > 0}
+    async def _async_filter_closed_sections(self, urls, course_pages=None):
+        """
+        Fetches each distinct course page once and reads the status of its sections.
 
-    def get_user_availabilities(self, item_list, show_unavailable=True):
-        urls = self._get_urls_from_itemlist(item_list)
+        Args:
+            urls (list): Section URLs to be polled.
+            course_pages (dict, optional): Course pages already read this sweep, by
+                URL (ex: while expanding "CPSC 110"), which are not fetched again.
+
+        Returns:
+            tuple: The section URLs that still need their own page fetched, and the
+            results of the sections whose course page status shows them closed.
+        """
+        urls_by_course = {}
         for url in urls:
-            result = self._extract_availability(url)
+            parsed_query = parse_qs(urlparse(url).query)
+            course_url = self.make_url(
+                **{
+                    key: parsed_query[key][0]
+                    for key in ("sesscd", "sessyr", "campuscd", "dept", "course")
+                    if key in parsed_query
+                }
+            )
+            urls_by_course.setdefault(course_url, []).append(url)
+
+        async def get_statuses(course_url):
+            page = (course_pages or {}).get(course_url)
+            if page is None:
+                page = await self._async_get_html(course_url)
+            return await self._parse(
+                course_url, parsers.parse_section_statuses, page
+            )
+
+        async with self:
+            course_statuses = await asyncio.gather(
+                *[get_statuses(course_url) for course_url in urls_by_course],
+                return_exceptions=True,
+            )
+
+        open_urls, closed = [], {}
+        for section_urls, statuses in zip(urls_by_course.values(), course_statuses):
+            for url in section_urls:
+                course_name = get_section_name(url)
+                # Fall back to the section page if the course page failed or
+                # does not list the section
+                status = (
+                    statuses.get(course_name) if isinstance(statuses, dict) else None
+                )
+                if status in self.CLOSED_SECTION_STATUSES:
+                    closed[course_name] = make_closed_result(status)
+                else:
+                    open_urls.append(url)
+        return open_urls, closed
+
+    async def stream_availabilities(
+        self, queue_items, show_unavailable=True, poll_courses=False
+    ):
+        """
+        Asynchronously checks the seat availability of the given items, yielding each
+        section as soon as its page is parsed.
+
+        Args:
+            queue_items (list): Items to check (ex: "CPSC", "CPSC 110", "CPSC 110 101").
+            show_unavailable (bool, optional): Whether to include sections without
+                general seats. Defaults to True.
+            poll_courses (bool, optional): Whether to read section statuses from course
+                pages first, fetching section pages only for sections that are not
+                Full / Blocked / Cancelled. Defaults to False.
+
+        Yields:
+            tuple: The section name (ex: "CPSC 110 101") and its seat availability.
+        """
+        self.reset_sweep_stats()
+        with self._profile_sweep("availabilities"):
+            async with self:
+                closed = {}
+                if poll_courses:
+                    # Course pages of this sweep, read once for both expansion and
+                    # section statuses
+                    course_pages = {}
+                    urls = await self._async_get_urls_from_itemlist(
+                        queue_items, course_pages
+                    )
+                    urls, closed = await self._async_filter_closed_sections(
+                        urls, course_pages
+                    )
+                else:
+                    urls = await self._async_get_urls_from_itemlist(queue_items)
+                if show_unavailable:
+                    for result in closed.items():
+                        yield result
+                async for course, seats in self._async_iter_tasks(
+                    urls, self.async_extract_available_seats
+                ):
+                    # Only show sections with availabilities
+                    if show_unavailable or seats.get("General Seats Remaining", 0) > 0:
+                        yield course, seats
+        logging.info(f"Sweep stats: {self.sweep_stats}")
+
+    async def async_get_user_availabilities(
+        self, queue_items, show_unavailable=True, poll_courses=False
+    ):
+        """
+        Asynchronously retrieves the seat availability of the given items.
+
+        Args:
+            queue_items (list): Items to check (ex: "CPSC", "CPSC 110", "CPSC 110 101").
+            show_unavailable (bool, optional): Whether to include sections without
+                general seats. Defaults to True.
+            poll_courses (bool, optional): See stream_availabilities.
+
+        Returns:
+            dict: The seat availability of each section checked by this call, keyed by
+            section name.
+        """
+        results = {}
+        async for result in self.stream_availabilities(
+            queue_items, show_unavailable, poll_courses
+        ):
             self.update_results(result)
+            course, seats = result
+            results[course] = seats
+        return results
+
+    def get_user_availabilities(self, item_list, show_unavailable=True):
+        self.reset_sweep_stats()
+        with self._profile_sweep("availabilities_sync"):
+            urls = self._get_urls_from_itemlist(item_list)
+            for url in urls:
+                result = self._extract_availability(url)
+                self.update_results(result)
         if show_unavailable:
             return self.results
         # Only show sections with availabilities
@@ -1,33 +1,135 @@
+import logging
+import time
+
 import streamlit as st
 import pymongo
+from pymongo.errors import OperationFailure
 from config import cfg
+from metrics import registry as metrics
 
 
 @st.cache_resource
 def init_db_connection():
     try:
-        return pymongo.MongoClient(st.secrets["mongo"]["uri"])
+        client = pymongo.MongoClient(st.secrets["mongo"]["uri"])
     except KeyError:
         raise Exception("Database connection failed. URI might be invalid!")
+    ensure_indexes(client)
+    migrate_course_tree(client)
+    return client
+
+
+def ensure_indexes(_client):
+    """
+    Creates the indexes the queries rely on. Safe to call on every startup, as
+    creating an existing index does nothing.
+
+    Args:
+        _client: The MongoDB client object.
+    """
+    user_profile_table = _client[cfg.USER_DB][cfg.USER_TABLE]
+    try:
+        # Profiles are upserted by email
+        user_profile_table.create_index("email", unique=True)
+    except OperationFailure as error:
+        # Existing duplicate emails have to be merged by hand first
+        logging.error(f"Could not create the unique email index: {error}")
+    # Multikey index, to find the watchers of a section
+    user_profile_table.create_index("tracked_courses")
 
 
 @st.cache_data(ttl=10 * cfg.MINUTES)
-def get_course_dropdown_data(_client):
+@metrics.timed("db_seconds", call="get_departments")
+def get_departments(_client):
+    """
+    Retrieves the sorted list of departments, without their courses.
+
+    Parameters:
+        _client (object): The MongoDB client object.
+
+    Returns:
+        list: The department codes (ex: "CPSC").
     """
-    Retrieves the course dropdown data from the database.
+    department_table = _client[cfg.COURSE_DB][cfg.DEPARTMENT_TABLE]
+    return [
+        department["_id"]
+        for department in department_table.find({}, {"_id": True}).sort("_id")
+    ]
+
+
+@st.cache_data(ttl=10 * cfg.MINUTES, max_entries=cfg.MAX_CACHED_DEPARTMENTS)
+@metrics.timed("db_seconds", call="get_department_courses")
+def get_department_courses(_client, department):
+    """
+    Retrieves the courses and sections of a single department.
 
     Parameters:
         _client (object): The MongoDB client object.
+        department (str): The department code (ex: "CPSC").
 
     Returns:
-        dict: A dictionary containing the course dropdown data.
+        dict: The sections of each course, with the courses in sorted order.
+    """
+    department_table = _client[cfg.COURSE_DB][cfg.DEPARTMENT_TABLE]
+    document = department_table.find_one({"_id": department}, {"_id": False, "courses": True})
+    courses = (document or {}).get("courses", {})
+    return {course: courses[course] for course in sorted(courses)}
 
+
+def save_course_tree(_client, course_tree):
     """
-    course_db = _client["courses"]
-    course_tree = course_db["course_tree"]
-    return course_tree.find_one({}, {"_id": False})
+    Saves the course tree as one document per department, then removes the
+    departments that are no longer in it. An empty tree (ex: a failed crawl) is
+    not saved, so it can't wipe the stored one.
 
+    Args:
+        _client: The MongoDB client object.
+        course_tree (dict or CourseTree): The sections of each course, keyed by
+            department and course.
 
+    Returns:
+        pymongo.results.BulkWriteResult: The result, or None if the tree is empty.
+    """
+    if not course_tree:
+        return None
+    department_table = _client[cfg.COURSE_DB][cfg.DEPARTMENT_TABLE]
+    # Upserted first, so readers never see a department missing in between
+    result = department_table.bulk_write(
+        [
+            pymongo.ReplaceOne(
+                {"_id": department}, {"courses": courses}, upsert=True
+            )
+            for department, courses in course_tree.items()
+        ],
+        ordered=False,
+    )
+    department_table.delete_many({"_id": {"$nin": list(course_tree)}})
+    return result
+
+
+def migrate_course_tree(_client):
+    """
+    Splits the legacy single-document course tree into per-department documents.
+    Runs on startup, and does nothing once the departments collection is filled.
+
+    Args:
+        _client: The MongoDB client object.
+
+    Returns:
+        int: The number of departments migrated.
+    """
+    department_table = _client[cfg.COURSE_DB][cfg.DEPARTMENT_TABLE]
+    if department_table.find_one({}, {"_id": True}) is not None:
+        return 0
+    legacy_table = _client[cfg.COURSE_DB][cfg.LEGACY_COURSE_TREE_TABLE]
+    course_tree = legacy_table.find_one({}, {"_id": False}) or {}
+    save_course_tree(_client, course_tree)
+    if course_tree:
+        logging.info(f"Migrated {len(course_tree)} departments from the legacy course tree")
+    return len(course_tree)
+
+
+@metrics.timed("db_seconds", call="save_user_info")
 def save_user_info_db(_client, orig_email, new_email, tracked_courses):
     """
     Save user information.
@@ -39,11 +141,22 @@ def save_user_info_db(_client, orig_email, new_email, tracked_courses):
         tracked_courses (list): A list of courses being tracked.
 
     Returns:
-        None
+        The pymongo result.
+
+    Raises:
+        pymongo.errors.DuplicateKeyError: If another profile already uses new_email,
+            whether the session had an email or not.
     """
     # 1. Obtain the users table
     user_profile_table = _client[cfg.USER_DB][cfg.USER_TABLE]
-    # 2. if exists, update email and tracked courses.
+    # 2. A session without an email yet creates a new profile, which the unique
+    #    email index refuses if the email is taken, rather than overwriting the
+    #    tracked courses of that profile
+    if not orig_email:
+        return user_profile_table.insert_one(
+            {"email": new_email, "tracked_courses": tracked_courses}
+        )
+    # 3. if exists, update email and tracked courses.
     #    Otherwise, create new user with new email and tracked courses (upsert document)
     result = user_profile_table.update_one(
         {"email": orig_email},
@@ -51,3 +164,98 @@ def save_user_info_db(_client, orig_email, new_email, tracked_courses):
         upsert=True,  # insert if not present
     )
     return result
+
+
+@metrics.timed("db_seconds", call="get_user_profiles")
+def get_user_profiles(_client):
+    """
+    Retrieves the email and tracked courses of every user.
+
+    Args:
+        _client: The client object.
+
+    Returns:
+        pymongo.cursor.Cursor: The user profiles.
+    """
+    user_profile_table = _client[cfg.USER_DB][cfg.USER_TABLE]
+    return user_profile_table.find(
+        {}, {"_id": False, "email": True, "tracked_courses": True}
+    )
+
+
+class BulkWriter:
+    """
+    Buffers upserts to a collection and writes them with one unordered bulk_write.
+
+    Upserts to the same document are merged, so a document updated several times
+    between flushes is only written once. upsert never writes: the caller flushes,
+    off the event loop if it has one, when due says so (max_buffer documents or
+    flush_interval seconds since the last flush) or when it is done. A failed
+    flush puts its upserts back in the buffer, for the next flush to retry.
+    """
+
+    def __init__(self, collection, flush_interval=cfg.DB_FLUSH_INTERVAL, max_buffer=1000):
+        """
+        Args:
+            collection (pymongo.collection.Collection): The collection written to.
+            flush_interval (float, optional): Seconds between flushes, see due.
+            max_buffer (int, optional): Buffered documents that make a flush due.
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer = {}
+        self._last_flush = time.monotonic()
+
+    def upsert(self, key, fields):
+        """
+        Buffers an upsert, setting the given fields on the document matching key.
+
+        Args:
+            key (dict): Filter matching a single document (ex: {"_id": section}).
+            fields (dict): The fields to set.
+        """
+        self._merge(tuple(sorted(key.items())), key, fields)
+
+    def _merge(self, buffer_key, key, fields):
+        if buffer_key in self._buffer:
+            self._buffer[buffer_key][1].update(fields)
+        else:
+            self._buffer[buffer_key] = (key, dict(fields))
+
+    @property
+    def due(self):
+        """
+        Returns:
+            bool: Whether the buffer is full or flush_interval seconds passed since
+            the last flush.
+        """
+        return (
+            len(self._buffer) >= self.max_buffer
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self):
+        """
+        Writes the buffered upserts. If the write fails, they are buffered again,
+        under the fields set since, and the error is raised.
+
+        Returns:
+            pymongo.results.BulkWriteResult: The result, or None if nothing was buffered.
+        """
+        self._last_flush = time.monotonic()
+        buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return None
+        operations = [
+            pymongo.UpdateOne(key, {"$set": fields}, upsert=True)
+            for key, fields in buffer.values()
+        ]
+        try:
+            with metrics.timer("db_seconds", call="bulk_write"):
+                return self.collection.bulk_write(operations, ordered=False)
+        except Exception:
+            newer, self._buffer = self._buffer, buffer
+            for buffer_key, (key, fields) in newer.items():
+                self._merge(buffer_key, key, fields)
+            raise
@@ -1,8 +1,10 @@
 import extra_streamlit_components as stx
 import streamlit as st
+from cache import response_cache
 from config import cfg
 from crawler import SSC_Scraper
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 import time
 
 
@@ -39,10 +41,11 @@ def track_reset_session_state(course, cookie_manager):
 
 def track_refresh_courses(placeholder_elements, courses, cookie_manager):
     """
-    Track the refresh of courses.
+    Track the refresh of courses. Each course's placeholder is updated as soon as
+    its result arrives, with a progress bar for the whole refresh.
 
     Args:
-        placeholder_elements (List[Placeholder]): The list of placeholder elements.
+        placeholder_elements (Dict[str, Placeholder]): The placeholder elements, keyed by course.
         courses (Dict[str, Any]): The dictionary of courses.
         cookie_manager (CookieManager): The cookie manager.
 
@@ -51,22 +54,30 @@ def track_refresh_courses(placeholder_elements, courses, cookie_manager):
     """
     import asyncio
 
-    scraper = SSC_Scraper()
-    results_by_course = asyncio.run(
-        scraper.async_get_user_availabilities(list(courses.keys()))
-    )
     # Get current state of tracked courses in cookie
     tracked_courses = cookie_manager.get(cfg.TRACKED_COURSES_KEY)
-
-    # Update cookies and streamlit elements
-    for (course, results), placeholder_element in zip(
-        results_by_course.items(), placeholder_elements
-    ):
-        # update cookie state, session state
-        tracked_courses[course] = results
-        st.session_state[cfg.TRACKED_COURSES_KEY][course] = results
-        # Update view in streamit
-        placeholder_element.table(results)
+    progress_bar = st.progress(0.0, text=f"0/{len(courses)} courses checked")
+
+    async def refresh():
+        # Pages refreshed by another session moments ago are served from the shared cache
+        scraper = SSC_Scraper(cache=response_cache)
+        checked = 0
+        async for course, results in scraper.stream_availabilities(list(courses)):
+            # Results arrive in completion order, so match them by course
+            placeholder_element = placeholder_elements.get(course)
+            if placeholder_element is None:
+                continue
+            # update cookie state, session state
+            tracked_courses[course] = results
+            st.session_state[cfg.TRACKED_COURSES_KEY][course] = results
+            # Update view in streamit
+            placeholder_element.table(results)
+            checked += 1
+            progress_bar.progress(
+                checked / len(courses), text=f"{checked}/{len(courses)} courses checked"
+            )
+
+    asyncio.run(refresh())
 
     # RE-set cookies
     cookie_manager.set(cfg.TRACKED_COURSES_KEY, tracked_courses, expires_at=None)
@@ -116,14 +127,18 @@ def save_email_to_session_and_cookie(orig_email, new_email, client, save_user_in
         email (str): The email to be saved.
 
     Returns:
-        None
+        The pymongo result, or None if the email is used by another profile.
     """
-    response = save_user_info_db(
-        client,
-        st.session_state[cfg.EMAIL_KEY],
-        new_email,
-        list(st.session_state[cfg.TRACKED_COURSES_KEY]),
-    )
+    try:
+        response = save_user_info_db(
+            client,
+            st.session_state[cfg.EMAIL_KEY],
+            new_email,
+            list(st.session_state[cfg.TRACKED_COURSES_KEY]),
+        )
+    except DuplicateKeyError:
+        st.error("This email is already used by another profile!")
+        return None
     st.session_state.user_email = new_email
     cookie_manager.set(cfg.EMAIL_KEY, st.session_state[cfg.EMAIL_KEY], expires_at=None)
     st.session_state["edit"] = False
@@ -41,7 +41,7 @@ def make_tracking_container(
     with col3:
         st.caption("Action")
 
-    placeholders = []
+    placeholders = {}
 
     for course in st.session_state[cfg.TRACKED_COURSES_KEY]:
         with st.container():
@@ -67,7 +67,7 @@ def make_tracking_container(
                     course_availability_data = {}
                 with st.expander(expander_text):
                     placeholder = st.dataframe(course_availability_data)
-                    placeholders.append(placeholder)
+                    placeholders[course] = placeholder
             with col3:
                 st.button(
                     "x",
@@ -90,25 +90,29 @@ def make_tracking_container(
     return
 
 
-def make_input_container(track_and_reset, course_dropdown_data):
+def make_input_container(track_and_reset, get_departments, get_department_courses, client):
     """
     Generates a container for user input with dropdown menus for department, course, and section.
 
     Parameters:
     - track_and_reset (function): A callback function to track and reset the input values.
-    - course_dropdown_data (dict): A dictionary containing the dropdown data for courses.
+    - get_departments (function): Loads the sorted list of departments.
+    - get_department_courses (function): Loads the courses and sections of a department.
+    - client (object): The MongoDB client object.
 
     Returns:
     None
     """
     col1, col2, col3 = st.columns((1, 1, 1))
     with col1:
-        department_options = [""] + sorted(course_dropdown_data.keys())
+        department_options = [""] + get_departments(client)
         department = st.selectbox(
             label="Department", options=department_options, key="department"
         )
+    # Only the selected department's courses are loaded
+    courses = get_department_courses(client, department) if department else {}
     with col2:
-        course_options = [""] + sorted(course_dropdown_data.get(department, {}).keys())
+        course_options = [""] + list(courses)
         course = st.selectbox(
             label="Course",
             options=course_options,
@@ -116,7 +120,7 @@ def make_input_container(track_and_reset, course_dropdown_data):
             key="course",
         )
     with col3:
-        section_options = course_dropdown_data.get(department, {}).get(course, [""])
+        section_options = courses.get(course, [""])
         section = st.selectbox(
             label="Section",
             options=section_options,
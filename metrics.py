@@ -0,0 +1,276 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"),
+)
+
+
+class Histogram:
+    """
+    Bucketed distribution of observed values, as exported to Prometheus.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimates a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            q (float): The quantile, between 0 and 1 (ex: 0.99).
+
+        Returns:
+            float: The estimate, or 0.0 if nothing was observed.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "started")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and timing histograms, keyed by name and labels.
+
+    Every update is also forwarded to the registered sinks (ex: JsonLinesSink).
+    The registry itself is the in-process API: read it back with get_counter and
+    get_histogram, or export it with render_prometheus.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.sinks = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        # Label values are strings in the exposition format, and must sort together
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increments a counter (ex: inc("http_responses", status=429)).
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        for sink in self.sinks:
+            sink.emit("counter", name, value, labels)
+
+    def observe(self, name, seconds, **labels):
+        """
+        Records a duration in a histogram (ex: observe("parse_seconds", 0.002)).
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+        for sink in self.sinks:
+            sink.emit("histogram", name, seconds, labels)
+
+    def timer(self, name, **labels):
+        """
+        Times a block into a histogram: `with registry.timer("db_seconds"): ...`
+        """
+        return _Timer(self, name, labels)
+
+    def timed(self, name, **labels):
+        """
+        Decorator timing every call of a function into a histogram.
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def get_counter(self, name, **labels):
+        return self.counters.get(self._key(name, labels), 0)
+
+    def get_histogram(self, name, **labels):
+        """
+        Returns:
+            Histogram: The histogram, or None if nothing was observed.
+        """
+        return self.histograms.get(self._key(name, labels))
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+
+def render_prometheus(registry):
+    """
+    Renders the registry in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics, counters prefixed with ubeseat_ and suffixed with _total.
+    """
+    lines = []
+    with registry._lock:
+        counters = sorted(registry.counters.items())
+        histograms = sorted(
+            (key, (list(h.counts), h.count, h.sum, h.buckets))
+            for key, h in registry.histograms.items()
+        )
+
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"ubeseat_{name}_total"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for (name, labels), (counts, count, total, buckets) in histograms:
+        metric = f"ubeseat_{name}"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(
+                f"{metric}_bucket{_format_labels(labels, [('le', le)])} {cumulative}"
+            )
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class JsonLinesSink:
+    """
+    Appends every counter increment and observation to a JSON lines file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._outfile = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def emit(self, kind, name, value, labels):
+        line = json.dumps(
+            {"ts": time.time(), "kind": kind, "name": name, "value": value, **labels}
+        )
+        with self._lock:
+            self._outfile.write(line + "\n")
+
+    def close(self):
+        self._outfile.close()
+
+
+def start_prometheus_server(port, metrics=None, host="0.0.0.0"):
+    """
+    Serves a registry, by default the shared one, on http://host:port/metrics
+    from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The server, stopped with shutdown().
+    """
+    metrics = metrics or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render_prometheus(metrics).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Serving metrics on port {port}")
+    return server
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_from_env():
+    """
+    Registers the sinks set through the environment, once per process:
+    METRICS_PORT serves Prometheus metrics, METRICS_LOG appends JSON lines.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+    if os.environ.get("METRICS_PORT"):
+        start_prometheus_server(int(os.environ["METRICS_PORT"]))
+    if os.environ.get("METRICS_LOG"):
+        registry.add_sink(JsonLinesSink(os.environ["METRICS_LOG"]))
+
+
+# Shared by the scraper, the poller and the app
+registry = MetricsRegistry()
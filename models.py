@@ -0,0 +1,245 @@
+import bisect
+import functools
+import sys
+from array import array
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+from parsers import SEAT_LABELS
+
+
+def intern_code(code):
+    """
+    Interns a department, course or section code, so that every occurrence of
+    the same code (ex: section "101" of thousands of courses) shares one string.
+    """
+    return sys.intern(code)
+
+
+@functools.lru_cache(maxsize=65536)
+def get_url_codes(url):
+    """
+    Reads the interned department, course and section codes of an SSC URL. Cached,
+    as the same URLs are parsed on every sweep.
+
+    Args:
+        url (str): The SSC URL.
+
+    Returns:
+        tuple: The dept, course and section codes, "" when missing.
+    """
+    query = parse_qs(urlparse(url).query)
+    return tuple(
+        intern_code(query.get(key, [""])[0]) for key in ("dept", "course", "section")
+    )
+
+
+@functools.lru_cache(maxsize=65536)
+def get_section_name(url):
+    """
+    Returns:
+        str: The interned section name of a section URL (ex: "CPSC 110 101").
+    """
+    return intern_code(" ".join(get_url_codes(url)))
+
+
+# Key marking results read from the status column of a course page. These only
+# know that the section is closed, not its seat counts.
+STATUS_KEY = "Status"
+
+
+def make_closed_result(status):
+    """
+    Args:
+        status (str): The status shown on the course page (ex: "Full").
+
+    Returns:
+        dict: The result of a closed section, without seat counts.
+    """
+    return {STATUS_KEY: status, "General Seats Remaining": 0}
+
+
+def is_closed_result(seats):
+    """
+    Returns:
+        bool: Whether a result came from a course page status, and so has no
+        seat counts besides the general seats.
+    """
+    return STATUS_KEY in seats
+
+
+class SeatSnapshot(NamedTuple):
+    """
+    Seat availability of a section, four ints instead of a dict of label strings.
+    """
+
+    total: int = 0
+    registered: int = 0
+    general: int = 0
+    restricted: int = 0
+
+    @classmethod
+    def from_dict(cls, seats):
+        """
+        Args:
+            seats (dict): Seat counts keyed by label (ex: "General Seats Remaining").
+        """
+        return cls(*(seats.get(label, 0) for label in SEAT_LABELS))
+
+    def close(self):
+        """
+        Returns:
+            SeatSnapshot: These counts without the general seats, for a section
+            that closed since they were read.
+        """
+        return self._replace(total=self.total - self.general, general=0)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: Seat counts keyed by label, as shown in the dashboard.
+        """
+        return dict(zip(SEAT_LABELS, self))
+
+
+class CourseTree:
+    """
+    Array-backed department -> course -> section tree.
+
+    Codes are stored once in flat lists, and the tree structure in offset arrays:
+    the courses of department d are course ids course_start[d] to
+    course_start[d + 1], and likewise for the sections of a course. A section id
+    is its index in the section list, so it fits in a machine int.
+
+    Reads like the nested dict it replaces ({dept: {course: [sections]}}), so it
+    can be passed where that dict is read (ex: db.save_course_tree).
+    """
+
+    def __init__(self):
+        self.departments = []
+        self.course_codes = []
+        self.section_codes = []
+        self.course_start = array("I", [0])
+        self.section_start = array("I", [0])
+        self._department_ids = {}
+        self._course_ids = {}
+
+    @classmethod
+    def from_dict(cls, tree):
+        """
+        Args:
+            tree (dict): The sections of each course, keyed by department and course.
+
+        Returns:
+            CourseTree: The compact tree.
+        """
+        course_tree = cls()
+        for dept, courses in tree.items():
+            course_tree.add_department(dept, courses)
+        return course_tree
+
+    def add_department(self, dept, courses):
+        """
+        Appends a department and its courses ({course: [sections]}).
+        """
+        self._department_ids[dept] = len(self.departments)
+        self.departments.append(intern_code(dept))
+        for course, sections in courses.items():
+            self._course_ids[(dept, course)] = len(self.course_codes)
+            self.course_codes.append(intern_code(course))
+            self.section_codes.extend(intern_code(section) for section in sections)
+            self.section_start.append(len(self.section_codes))
+        self.course_start.append(len(self.course_codes))
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The sections of each course, keyed by department and course.
+        """
+        return {dept: self.get_courses(dept) for dept in self.departments}
+
+    def __len__(self):
+        return len(self.departments)
+
+    def __iter__(self):
+        return iter(self.departments)
+
+    def __contains__(self, dept):
+        return dept in self._department_ids
+
+    def __getitem__(self, dept):
+        if dept not in self._department_ids:
+            raise KeyError(dept)
+        return self.get_courses(dept)
+
+    def get(self, dept, default=None):
+        return self.get_courses(dept) if dept in self._department_ids else default
+
+    def items(self):
+        for dept in self.departments:
+            yield dept, self.get_courses(dept)
+
+    @property
+    def num_sections(self):
+        return len(self.section_codes)
+
+    def get_departments(self):
+        return list(self.departments)
+
+    def get_courses(self, dept):
+        """
+        Args:
+            dept (str): The department code (ex: "CPSC").
+
+        Returns:
+            dict: The sections of each course of the department, or {} if unknown.
+        """
+        dept_id = self._department_ids.get(dept)
+        if dept_id is None:
+            return {}
+        return {
+            self.course_codes[course_id]: self.section_codes[
+                self.section_start[course_id] : self.section_start[course_id + 1]
+            ]
+            for course_id in range(
+                self.course_start[dept_id], self.course_start[dept_id + 1]
+            )
+        }
+
+    def get_section_id(self, name):
+        """
+        Args:
+            name (str): The section name (ex: "CPSC 110 101").
+
+        Returns:
+            int: The section id, or None if the section is not in the tree.
+        """
+        dept, course, section = name.split()
+        course_id = self._course_ids.get((dept, course))
+        if course_id is None:
+            return None
+        # A course has a handful of sections
+        for section_id in range(
+            self.section_start[course_id], self.section_start[course_id + 1]
+        ):
+            if self.section_codes[section_id] == section:
+                return section_id
+        return None
+
+    def get_section_name(self, section_id):
+        """
+        Args:
+            section_id (int): The section id.
+
+        Returns:
+            str: The section name (ex: "CPSC 110 101").
+        """
+        course_id = bisect.bisect_right(self.section_start, section_id) - 1
+        dept_id = bisect.bisect_right(self.course_start, course_id) - 1
+        return " ".join(
+            (
+                self.departments[dept_id],
+                self.course_codes[course_id],
+                self.section_codes[section_id],
+            )
+        )
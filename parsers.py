@@ -0,0 +1,235 @@
+import re
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, the "lxml" backend falls back to BeautifulSoup
+    lxml = None
+
+
+SEAT_LABELS = (
+    "Total Seats Remaining",
+    "Currently Registered",
+    "General Seats Remaining",
+    "Restricted Seats Remaining",
+)
+
+# <td width=200px>Total Seats Remaining:</td><td align=left><strong>0</strong></td>
+SEAT_ROW_REGEX = re.compile(
+    r"<td[^>]*>\s*(" + "|".join(SEAT_LABELS) + r")\*?:?\s*</td>"
+    r"\s*<td[^>]*>\s*<strong>\s*(-?\d+)\s*</strong>",
+    re.IGNORECASE,
+)
+SEAT_TABLE_STRAINER = SoupStrainer("td")
+SEAT_LABEL_XPATH = "//td[starts-with(normalize-space(.), '{label}')]"
+
+NOT_OFFERED_TEXT = "The requested course is either no longer offered"
+
+
+def _to_text(html):
+    if isinstance(html, bytes):
+        return html.decode("utf-8", errors="replace")
+    return html
+
+
+def _normalize_label(text):
+    """
+    Maps a seat summary cell text (ex: "Restricted Seats Remaining*:") to its label.
+    """
+    text = text.strip().rstrip(":").rstrip("*").strip()
+    for label in SEAT_LABELS:
+        if text.lower() == label.lower():
+            return label
+    return None
+
+
+def _complete(seats):
+    if len(seats) != len(SEAT_LABELS):
+        return None
+    return {label: seats[label] for label in SEAT_LABELS}
+
+
+def parse_seats_soup(html):
+    """
+    Reference parser: builds the whole page tree and reads the first four numbers
+    in <strong> tags.
+
+    Args:
+        html (str | bytes): The section page.
+
+    Returns:
+        dict: The seat summary, keyed by label.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    nums = []
+    for item in soup.find_all("strong"):
+        try:
+            nums.append(int(item.text))
+        except ValueError:
+            continue
+    return {label: num for label, num in zip(SEAT_LABELS, nums)}
+
+
+def parse_seats_strainer(html):
+    """
+    Parses only the <td> cells of the page and reads the seat summary rows.
+
+    Returns:
+        dict: The seat summary, or None if the layout is not recognised.
+    """
+    cells = BeautifulSoup(html, "html.parser", parse_only=SEAT_TABLE_STRAINER)
+    seats = {}
+    for cell in cells.find_all("td"):
+        label = _normalize_label(cell.get_text())
+        if label is None or label in seats:
+            continue
+        value_cell = cell.find_next_sibling("td")
+        strong = value_cell.find("strong") if value_cell is not None else None
+        if strong is None:
+            continue
+        try:
+            seats[label] = int(strong.get_text().strip())
+        except ValueError:
+            continue
+    return _complete(seats)
+
+
+def parse_seats_lxml(html):
+    """
+    Reads the seat summary rows with lxml.
+
+    Returns:
+        dict: The seat summary, or None if lxml is not installed or the layout is
+        not recognised.
+    """
+    if lxml is None:
+        return None
+    try:
+        tree = lxml.html.fromstring(html)
+    except Exception:
+        return None
+    seats = {}
+    for label in SEAT_LABELS:
+        for cell in tree.xpath(SEAT_LABEL_XPATH.format(label=label)):
+            values = cell.xpath("following-sibling::td[1]//strong/text()")
+            try:
+                seats[label] = int(values[0].strip())
+                break
+            except (IndexError, ValueError):
+                continue
+    return _complete(seats)
+
+
+def parse_seats_regex(html):
+    """
+    Fast path: reads the seat summary rows with a precompiled regex.
+
+    Returns:
+        dict: The seat summary, or None if the layout is not recognised.
+    """
+    seats = {}
+    for match in SEAT_ROW_REGEX.finditer(_to_text(html)):
+        label = _normalize_label(match.group(1))
+        seats.setdefault(label, int(match.group(2)))
+    return _complete(seats)
+
+
+SEAT_PARSERS = {
+    "soup": parse_seats_soup,
+    "strainer": parse_seats_strainer,
+    "lxml": parse_seats_lxml,
+    "regex": parse_seats_regex,
+}
+
+
+def parse_seats(html, backend="regex"):
+    """
+    Extracts the seat summary of a section page.
+
+    Args:
+        html (str | bytes): The section page.
+        backend (str, optional): One of "regex", "lxml", "strainer" or "soup".
+            Defaults to "regex".
+
+    Returns:
+        dict: The seat summary, keyed by label. Falls back to the full
+        BeautifulSoup parse when the backend does not recognise the layout.
+    """
+    seats = SEAT_PARSERS[backend](html)
+    if seats is None:
+        seats = parse_seats_soup(html)
+    return seats
+
+
+def parse_links(html, pattern):
+    """
+    Extracts the text of every link whose href matches a pattern.
+
+    Args:
+        html (str | bytes): The department or course page.
+        pattern (str): The regular expression the href attribute must match.
+
+    Returns:
+        list: The link texts (ex: "CPSC 110"), or an empty list if the course or
+        department is not offered this term.
+    """
+    if NOT_OFFERED_TEXT in _to_text(html):
+        return []
+    links = BeautifulSoup(
+        html, "html.parser", parse_only=SoupStrainer("a", href=re.compile(pattern))
+    )
+    return [link.get_text() for link in links.find_all("a")]
+
+
+def parse_section_statuses(html):
+    """
+    Reads the status column of every section listed on a course page.
+
+    Args:
+        html (str | bytes): The course (subj-course) page.
+
+    Returns:
+        dict: The status of each section (ex: "Full", "Blocked" or "" when open),
+        keyed by section name (ex: "CPSC 110 101").
+    """
+    rows = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("tr"))
+    statuses = {}
+    for row in rows.find_all("tr"):
+        link = row.find("a", href=re.compile("tname=subj-section"))
+        cells = row.find_all("td", recursive=False)
+        if link is None or not cells:
+            continue
+        statuses[link.get_text().strip()] = cells[0].get_text().strip()
+    return statuses
+
+
+def validate_seat_parsers(pages):
+    """
+    Checks every parser backend against the reference parser.
+
+    Args:
+        pages (dict): Saved section pages, keyed by name.
+
+    Returns:
+        dict: For each backend, the names of the pages where it disagreed with the
+        reference parser or did not recognise the layout.
+    """
+    mismatches = {backend: [] for backend in SEAT_PARSERS if backend != "soup"}
+    for name, html in pages.items():
+        expected = parse_seats_soup(html)
+        for backend in mismatches:
+            if SEAT_PARSERS[backend](html) != expected:
+                mismatches[backend].append(name)
+    return mismatches
+
+
+if __name__ == "__main__":
+    # Usage: python parsers.py <directory of saved section pages>
+    corpus = {path.name: path.read_bytes() for path in Path(sys.argv[1]).glob("*.html")}
+    for backend, names in validate_seat_parsers(corpus).items():
+        print(f"{backend}: {len(corpus) - len(names)}/{len(corpus)} pages match")
+        for name in names:
+            print(f"  mismatch: {name}")
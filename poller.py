@@ -0,0 +1,462 @@
+import argparse
+import asyncio
+import logging
+import os
+import smtplib
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+import pymongo
+
+import metrics
+from config import cfg
+from crawler import SSC_Scraper
+from db import BulkWriter, ensure_indexes, get_user_profiles
+from scheduler import PriorityScheduler
+from profiling import SweepProfiler
+from sharding import ShardLeaseManager
+from timeseries import LocalSeatHistory, MongoSeatHistory
+from transport import make_transport
+
+
+def build_watcher_index(profiles):
+    """
+    Builds an inverted index from section to the emails of the users watching it.
+
+    Args:
+        profiles (iterable): User profiles with "email" and "tracked_courses" fields.
+
+    Returns:
+        dict: The set of watcher emails, keyed by section (ex: "CPSC 110 101").
+    """
+    index = {}
+    for profile in profiles:
+        email = profile.get("email")
+        if not email:
+            continue
+        for section in profile.get("tracked_courses") or []:
+            # Only sections can be polled and notified on
+            if len(section.split()) != 3:
+                continue
+            index.setdefault(" ".join(section.split()), set()).add(email)
+    return index
+
+
+class LogNotifier:
+    """
+    Notifier that only logs, used when no SMTP server is configured.
+    """
+
+    def send(self, email, sections):
+        logging.info(f"Would notify {email} about {', '.join(sections)}")
+
+
+class EmailNotifier:
+    """
+    Sends seat availability alerts through an SMTP server.
+    """
+
+    def __init__(self, host, port, username, password, sender):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+
+    @staticmethod
+    def format_message(sections):
+        lines = ["Seats have opened up in the following courses:", ""]
+        for section, seats in sections.items():
+            dept, course, section_code = section.split()
+            url = SSC_Scraper.make_url(dept=dept, course=course, section=section_code)
+            lines.append(
+                f"- {section}: {seats.get('General Seats Remaining', 0)} general seat(s) remaining ({url})"
+            )
+        return "\n".join(lines)
+
+    def send(self, email, sections):
+        """
+        Sends one email listing every section that opened up for this user.
+
+        Args:
+            email (str): The recipient.
+            sections (dict): The seat availability of each opened section.
+        """
+        message = EmailMessage()
+        message["Subject"] = cfg.NOTIFICATION_SUBJECT
+        message["From"] = self.sender
+        message["To"] = email
+        message.set_content(self.format_message(sections))
+        with smtplib.SMTP(self.host, self.port) as server:
+            server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+            server.send_message(message)
+
+
+class Poller:
+    """
+    Polls every tracked section once per cycle and emails its watchers when general
+    seats open up (0 -> more than 0). The cost of a cycle is proportional to the
+    number of distinct sections, not to the number of users.
+
+    With a PriorityScheduler, sections are instead polled whenever the scheduler
+    says they are due, and the watcher index is reloaded once per interval.
+
+    With a ShardLeaseManager, the node only polls sections of the shards it holds
+    a lease on, so several pollers can split the work.
+
+    With a SeatHistory, every poll result is also appended to the seat history.
+    """
+
+    def __init__(
+        self,
+        client,
+        notifier,
+        scraper=None,
+        interval=cfg.POLL_INTERVAL,
+        scheduler=None,
+        leases=None,
+        history=None,
+        notification_cooldown=cfg.NOTIFICATION_COOLDOWN,
+    ):
+        self.client = client
+        self.notifier = notifier
+        self.scraper = scraper or SSC_Scraper()
+        self.interval = interval
+        self.scheduler = scheduler
+        self.leases = leases
+        self.history = history
+        self.notification_cooldown = timedelta(seconds=notification_cooldown)
+        self.watcher_index = {}
+        # General seats remaining at the last poll, by section
+        self.general_seats = {}
+        # When the watchers of each section were last notified
+        self.notified_at = {}
+        # Watchers already notified about an opening whose other alerts failed
+        self.delivered = {}
+        # Last seats and notification times, persisted across restarts
+        self.state_table = client[cfg.POLLER_DB][cfg.SECTION_STATE_TABLE]
+        self.state_writer = BulkWriter(self.state_table)
+
+    def load_state(self):
+        """
+        Loads the general seats of the last poll of every section, so a restart
+        does not miss sections that opened up in the meantime, and when each
+        section was last notified, so a restart does not notify again too soon.
+        """
+        for state in self.state_table.find({}, {"general": True, "notified_at": True}):
+            self.general_seats[state["_id"]] = state.get("general", 0)
+            notified_at = state.get("notified_at")
+            if notified_at is not None:
+                # MongoDB returns naive UTC datetimes
+                self.notified_at[state["_id"]] = notified_at.replace(tzinfo=timezone.utc)
+        return self.general_seats
+
+    async def load_watcher_index(self):
+        # The profile scan blocks, like every other DB call of the poller
+        self.watcher_index = await asyncio.to_thread(
+            lambda: build_watcher_index(get_user_profiles(self.client))
+        )
+        if self.leases is not None:
+            self.watcher_index = {
+                section: watchers
+                for section, watchers in self.watcher_index.items()
+                if self.leases.owns(section)
+            }
+        if self.scheduler is not None:
+            self.scheduler.update_watchers(self.watcher_index)
+        return self.watcher_index
+
+    async def poll_once(self, sections=None):
+        """
+        Runs one polling cycle.
+
+        Args:
+            sections (list, optional): The sections to poll. Defaults to every
+                section in a freshly loaded watcher index.
+
+        Returns:
+            dict: The seat availability of the sections that opened up this cycle.
+        """
+        started = time.perf_counter()
+        if sections is None:
+            sections = list(await self.load_watcher_index())
+        if self.leases is not None:
+            # Leases may have been lost since the sections were picked
+            sections = self.leases.filter_sections(sections)
+        index = self.watcher_index
+        opened = {}
+        polled = set()
+        async for section, seats in self.scraper.stream_availabilities(
+            sections, poll_courses=True
+        ):
+            if self.leases is not None and not self.leases.owns(section):
+                # The lease was lost during a long cycle; the new owner polls it
+                continue
+            polled.add(section)
+            if self.history is not None:
+                self.history.append(section, seats)
+            if self.scheduler is not None:
+                self.scheduler.record(section, seats)
+            general = seats.get("General Seats Remaining", 0)
+            now = datetime.now(timezone.utc)
+            fields = {"seats": seats, "polled_at": now}
+            # The first poll of a section only records a baseline
+            if self.general_seats.get(section) == 0 and general > 0:
+                notified_at = self.notified_at.get(section)
+                # Sections whose seats flicker are only notified once per cooldown
+                if notified_at is None or now - notified_at >= self.notification_cooldown:
+                    opened[section] = seats
+            if general == 0:
+                self.delivered.pop(section, None)
+            # An opening stays at 0 general seats until its watchers are notified,
+            # so that the next cycle retries the alerts that failed
+            if section not in opened:
+                self.general_seats[section] = general
+                fields["general"] = general
+            self.state_writer.upsert({"_id": section}, fields)
+            if self.state_writer.due:
+                await self.flush_state()
+        if self.scheduler is not None:
+            for section in set(sections) - polled:
+                self.scheduler.defer(section)
+        await self.flush_state()
+        if self.history is not None:
+            try:
+                await asyncio.to_thread(self.history.flush_if_due)
+            except Exception as error:
+                logging.error(f"Failed to save seat history: {error!r}")
+
+        # Fan out: one email per watcher, listing all of their opened sections
+        by_email = {}
+        for section, seats in opened.items():
+            for email in index.get(section, ()):
+                if email not in self.delivered.get(section, ()):
+                    by_email.setdefault(email, {})[section] = seats
+        for email, sections in by_email.items():
+            try:
+                await asyncio.to_thread(self.notifier.send, email, sections)
+                metrics.registry.inc("notifications_sent")
+            except Exception as error:
+                metrics.registry.inc("notifications_failed")
+                logging.error(f"Failed to notify {email}: {error!r}")
+                continue
+            for section in sections:
+                self.delivered.setdefault(section, set()).add(email)
+
+        # Openings are only recorded once every watcher was notified
+        now = datetime.now(timezone.utc)
+        for section, seats in opened.items():
+            if set(index.get(section, ())) <= self.delivered.get(section, set()):
+                self.delivered.pop(section, None)
+                general = seats.get("General Seats Remaining", 0)
+                self.general_seats[section] = general
+                self.notified_at[section] = now
+                self.state_writer.upsert(
+                    {"_id": section}, {"general": general, "notified_at": now}
+                )
+        if opened:
+            await self.flush_state()
+
+        metrics.registry.observe("poll_cycle_seconds", time.perf_counter() - started)
+        logging.info(
+            f"Polled {len(sections)} sections, {len(opened)} opened, {len(by_email)} users notified"
+        )
+        return opened
+
+    async def flush_state(self):
+        """
+        Writes the buffered section state off the event loop. A failed write is
+        logged, and its upserts are retried by the next flush.
+        """
+        try:
+            await asyncio.to_thread(self.state_writer.flush)
+        except Exception as error:
+            logging.error(f"Failed to save section state: {error!r}")
+
+    async def run_scheduled(self):
+        """
+        Polls forever, each section when the scheduler says it is due.
+        """
+        reload_at = 0.0
+        async with self.scraper:
+            while True:
+                try:
+                    if time.monotonic() >= reload_at:
+                        await self.load_watcher_index()
+                        reload_at = time.monotonic() + self.interval
+                    due = self.scheduler.pop_due()
+                    if due:
+                        await self.poll_once(due)
+                except Exception as error:
+                    logging.error(f"Polling cycle failed: {error!r}")
+                # Sleep until the next section is due or the index needs reloading
+                next_due = self.scheduler.get_next_due()
+                wake_at = reload_at if next_due is None else min(reload_at, next_due)
+                await asyncio.sleep(max(0.0, wake_at - time.monotonic()))
+
+    async def keep_leases(self):
+        """
+        Heartbeats the shard leases until cancelled.
+        """
+        while True:
+            try:
+                owned = await asyncio.to_thread(self.leases.heartbeat)
+                logging.debug(f"Holding shards {sorted(owned)}")
+            except Exception as error:
+                logging.error(f"Lease heartbeat failed: {error!r}")
+            await asyncio.sleep(self.leases.heartbeat_interval)
+
+    async def run(self, cycles=None):
+        """
+        Polls forever, or for the given number of cycles, one cycle per interval.
+        """
+        await asyncio.to_thread(self.load_state)
+        heartbeat = None
+        if self.leases is not None:
+            await asyncio.to_thread(self.leases.heartbeat)
+            heartbeat = asyncio.create_task(self.keep_leases())
+        try:
+            return await self._run(cycles)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+                await asyncio.to_thread(self.leases.release_all)
+            if self.history is not None:
+                # Write the rows still buffered across cycles
+                await asyncio.to_thread(self.history.flush)
+
+    async def _run(self, cycles=None):
+        if self.scheduler is not None and cycles is None:
+            return await self.run_scheduled()
+        cycle = 0
+        # One pooled session for every cycle
+        async with self.scraper:
+            while cycles is None or cycle < cycles:
+                started = time.monotonic()
+                try:
+                    await self.poll_once()
+                except Exception as error:
+                    logging.error(f"Polling cycle failed: {error!r}")
+                cycle += 1
+                if cycles is None or cycle < cycles:
+                    await asyncio.sleep(
+                        max(0.0, self.interval - (time.monotonic() - started))
+                    )
+
+
+def make_notifier():
+    """
+    Creates an EmailNotifier from the SMTP_* environment variables, or a LogNotifier
+    if SMTP_HOST is not set.
+    """
+    host = os.environ.get("SMTP_HOST")
+    if not host:
+        logging.warning("SMTP_HOST not set, notifications will only be logged")
+        return LogNotifier()
+    return EmailNotifier(
+        host=host,
+        port=int(os.environ.get("SMTP_PORT", 587)),
+        username=os.environ.get("SMTP_USERNAME"),
+        password=os.environ.get("SMTP_PASSWORD"),
+        sender=os.environ.get("SMTP_SENDER", os.environ.get("SMTP_USERNAME", "")),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ubeseat background poller")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGO_URI"))
+    parser.add_argument("--interval", type=float, default=cfg.POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Run a single cycle")
+    parser.add_argument(
+        "--priority",
+        action="store_true",
+        help="Poll hot sections more often than cold ones, within the request budget",
+    )
+    parser.add_argument("--budget", type=float, default=cfg.POLL_REQUEST_BUDGET)
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help="Split sections with other pollers through MongoDB shard leases",
+    )
+    parser.add_argument("--node-id", default=None)
+    parser.add_argument(
+        "--history",
+        choices=["local", "mongo"],
+        default=None,
+        help="Keep the seat history of every polled section",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=["live", "record", "replay"],
+        default="live",
+        help="Record the pages fetched to --archive, or replay them from it",
+    )
+    parser.add_argument("--archive", default=None)
+    parser.add_argument(
+        "--metrics-port", type=int, default=None, help="Serve Prometheus metrics"
+    )
+    parser.add_argument(
+        "--metrics-log", default=None, help="Append every metric to this JSON lines file"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=["cprofile", "sample"],
+        default=None,
+        help="Profile every polling sweep, with tracemalloc allocation sites",
+    )
+    parser.add_argument("--profile-dir", default="profiles")
+    parser.add_argument(
+        "--profile-min-duration",
+        type=float,
+        default=0.0,
+        help="Only keep the profiles of sweeps slower than this many seconds",
+    )
+    args = parser.parse_args()
+
+    if not args.mongo_uri:
+        parser.error("--mongo-uri or MONGO_URI is required")
+
+    logging.basicConfig(level=logging.INFO)
+    if args.metrics_port is not None:
+        metrics.start_prometheus_server(args.metrics_port)
+    if args.metrics_log is not None:
+        metrics.registry.add_sink(metrics.JsonLinesSink(args.metrics_log))
+    scheduler = None
+    if args.priority:
+        scheduler = PriorityScheduler(
+            request_budget=args.budget, calendar=cfg.REGISTRATION_CALENDAR
+        )
+    client = pymongo.MongoClient(args.mongo_uri)
+    ensure_indexes(client)
+    leases = ShardLeaseManager(client, node_id=args.node_id) if args.sharded else None
+    transport = make_transport(args.transport, args.archive)
+    profiler = None
+    if args.profile is not None:
+        profiler = SweepProfiler(
+            args.profile_dir, mode=args.profile, min_duration=args.profile_min_duration
+        )
+    history = None
+    if args.history == "local":
+        history = LocalSeatHistory()
+    elif args.history == "mongo":
+        history = MongoSeatHistory(client)
+    poller = Poller(
+        client,
+        make_notifier(),
+        scraper=SSC_Scraper(transport=transport, profiler=profiler),
+        interval=args.interval,
+        scheduler=scheduler,
+        leases=leases,
+        history=history,
+    )
+    try:
+        asyncio.run(poller.run(cycles=1 if args.once else None))
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import cProfile
+import contextlib
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+
+class StackSampler:
+    """
+    Sampling profiler: records the stack of one thread every interval seconds,
+    and writes the counts in the collapsed format read by flamegraph tools
+    ("outer;inner;leaf count" per line). Started and stopped like cProfile.Profile.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def enable(self):
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def disable(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as outfile:
+            for stack, count in self.stacks.most_common():
+                outfile.write(f"{stack} {count}\n")
+
+
+class SweepProfiler:
+    """
+    Profiles whole sweeps of the scraper, with cProfile or the stack sampler,
+    plus tracemalloc to find the top allocation sites.
+
+    Every sweep writes <name>-<time>-<n>.pstats (cProfile) or .collapsed (sampler)
+    and <name>-<time>-<n>.allocations.txt to output_dir. Sweeps started while one
+    is being profiled (ex: nested calls) are part of the outer profile.
+    """
+
+    def __init__(
+        self,
+        output_dir="profiles",
+        mode="cprofile",
+        trace_memory=True,
+        top_allocations=25,
+        sample_interval=0.005,
+        min_duration=0.0,
+    ):
+        """
+        Args:
+            output_dir (str, optional): Where the profiles are written.
+            mode (str, optional): "cprofile" for deterministic profiling or "sample"
+                for the lower overhead stack sampler.
+            trace_memory (bool, optional): Whether to also trace allocations.
+            top_allocations (int, optional): Allocation sites written per sweep.
+            sample_interval (float, optional): Seconds between stack samples.
+            min_duration (float, optional): Sweeps shorter than this many seconds
+                are not written, so only slow sweeps are kept.
+        """
+        if mode not in ("cprofile", "sample"):
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected cprofile or sample")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.trace_memory = trace_memory
+        self.top_allocations = top_allocations
+        self.sample_interval = sample_interval
+        self.min_duration = min_duration
+        self._active = False
+        self._count = itertools.count()
+
+    @contextlib.contextmanager
+    def profile(self, name):
+        """
+        Profiles the enclosed block as one sweep.
+
+        Args:
+            name (str): Name of the sweep, used in the file names.
+        """
+        if self._active:
+            yield
+            return
+        self._active = True
+
+        started_tracing = False
+        snapshot = None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            snapshot = tracemalloc.take_snapshot()
+
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+        else:
+            profiler = StackSampler(self.sample_interval)
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - started
+            try:
+                if duration >= self.min_duration:
+                    allocations = None
+                    if snapshot is not None:
+                        allocations = tracemalloc.take_snapshot().compare_to(
+                            snapshot, "lineno"
+                        )
+                    self._write(name, duration, profiler, allocations)
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+                self._active = False
+
+    def _write(self, name, duration, profiler, allocations):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(
+            self.output_dir,
+            f"{name}-{datetime.now():%Y%m%dT%H%M%S}-{next(self._count)}",
+        )
+        if self.mode == "cprofile":
+            profiler.dump_stats(f"{stem}.pstats")
+        else:
+            profiler.write(f"{stem}.collapsed")
+        if allocations is not None:
+            with open(f"{stem}.allocations.txt", "w") as outfile:
+                outfile.write(f"Sweep {name} took {duration:.3f}s\n")
+                outfile.write(f"Top {self.top_allocations} allocation sites by growth:\n")
+                for stat in allocations[: self.top_allocations]:
+                    outfile.write(f"{stat}\n")
+        logging.info(f"Profiled {name} ({duration:.3f}s) to {stem}.*")
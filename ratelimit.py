@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Token bucket limiting how many requests can be started per second.
+
+    Tokens refill continuously at `rate` per second, up to `capacity`. Each request
+    consumes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self):
+        """
+        Waits until a token is available and consumes it.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AdaptiveLimiter:
+    """
+    Adaptive rate limiter for requests against SSC.
+
+    Combines a token bucket (requests started per second) with an AIMD concurrency
+    limit (requests in flight). Both grow additively while SSC answers quickly and
+    successfully, and are cut multiplicatively when we see HTTP 429s, a high error
+    rate or latency above the target.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=60,
+        min_concurrency=2,
+        initial_concurrency=10,
+        rate=20.0,
+        min_rate=1.0,
+        max_rate=100.0,
+        target_latency=5.0,
+        error_threshold=0.1,
+        decrease_factor=0.5,
+        window=20,
+        cooldown=2.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.limit = float(
+            max(self.min_concurrency, min(initial_concurrency, max_concurrency))
+        )
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+
+        self.bucket = TokenBucket(rate)
+        self.in_flight = 0
+        self.latency = None
+        self._outcomes = deque(maxlen=window)
+        self._last_decrease = 0.0
+        self._condition = None
+        self._loop = None
+
+        self.stats = {"successes": 0, "errors": 0, "throttled": 0, "decreases": 0}
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def _get_condition(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._condition = asyncio.Condition()
+            self.in_flight = 0
+        return self._condition
+
+    async def acquire(self):
+        """
+        Waits for a free concurrency slot and a rate token.
+        """
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Async context manager holding one slot for the duration of a request.
+        """
+        await self.acquire()
+        try:
+            yield self
+        finally:
+            await self.release()
+
+    def record(self, latency, status=None):
+        """
+        Records the outcome of a request and adjusts the limits.
+
+        Args:
+            latency (float): The time taken by the request, in seconds.
+            status (int, optional): The HTTP status, or None if the request failed
+                before a response was received.
+        """
+        throttled = status == 429
+        failed = status is None or status >= 500
+        if throttled:
+            self.stats["throttled"] += 1
+        elif failed:
+            self.stats["errors"] += 1
+        else:
+            self.stats["successes"] += 1
+
+        self._outcomes.append(throttled or failed)
+        if not failed:
+            self.latency = (
+                latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            )
+
+        error_rate = sum(self._outcomes) / len(self._outcomes)
+        overloaded = (
+            throttled
+            or error_rate > self.error_threshold
+            or (self.latency is not None and self.latency > self.target_latency)
+        )
+        if overloaded:
+            self._decrease()
+        elif not failed:
+            self._increase()
+
+    def _increase(self):
+        # Additive increase: about +1 slot and +1 request/s per round of successes
+        step = 1.0 / max(self.limit, 1.0)
+        self.limit = min(float(self.max_concurrency), self.limit + step)
+        self.bucket.rate = min(self.max_rate, self.bucket.rate + step)
+
+    def _decrease(self):
+        # Multiplicative decrease, at most once per cooldown so that a burst of
+        # failures from requests already in flight counts as a single signal
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.stats["decreases"] += 1
+        self.limit = max(
+            float(self.min_concurrency), self.limit * self.decrease_factor
+        )
+        self.bucket.rate = max(self.min_rate, self.bucket.rate * self.decrease_factor)
+        self._outcomes.clear()
@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import math
+import time
+from datetime import datetime
+
+from models import SeatSnapshot, is_closed_result
+
+
+class SectionState:
+    __slots__ = ("watchers", "volatility", "last_seats", "next_due", "version")
+
+    def __init__(self, watchers):
+        self.watchers = watchers
+        # Moving average of how much the seat counts change between polls
+        self.volatility = 0.0
+        self.last_seats = None
+        self.next_due = 0.0
+        self.version = 0
+
+
+class PriorityScheduler:
+    """
+    Decides when each tracked section is polled next.
+
+    Every section gets a weight from its watcher count and how volatile its seat
+    counts have been recently. The request budget (requests per second, scaled by
+    the registration calendar) is shared between sections in proportion to their
+    weight, so hot sections are polled more often than cold ones while the total
+    request rate stays the same.
+    """
+
+    def __init__(
+        self,
+        request_budget=1.0,
+        min_interval=15.0,
+        max_interval=30 * 60.0,
+        volatility_decay=0.3,
+        calendar=(),
+        clock=time.monotonic,
+    ):
+        """
+        Args:
+            request_budget (float, optional): Section polls per second across all sections.
+            min_interval (float, optional): Shortest interval between polls of a section, in seconds.
+            max_interval (float, optional): Longest interval between polls of a section, in seconds.
+            volatility_decay (float, optional): Weight of the latest change in the volatility average.
+            calendar (iterable, optional): (start, end, factor) registration windows; the
+                budget is multiplied by factor between the start and end datetimes.
+            clock (callable, optional): Monotonic clock, in seconds.
+        """
+        self.request_budget = request_budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.volatility_decay = volatility_decay
+        self.calendar = list(calendar)
+        self.clock = clock
+
+        self.sections = {}
+        self._heap = []
+        self._versions = itertools.count()
+        # Sum of all weights, recomputed once per batch of due sections
+        self._total_weight = None
+
+    def get_calendar_factor(self, now=None):
+        now = now or datetime.now()
+        factor = 1.0
+        for start, end, window_factor in self.calendar:
+            if start <= now < end:
+                factor = max(factor, window_factor)
+        return factor
+
+    def get_weight(self, state):
+        return (1.0 + math.log2(1 + state.watchers)) * (1.0 + state.volatility)
+
+    def get_interval(self, section):
+        """
+        Computes how long to wait before polling a section again.
+
+        Args:
+            section (str): The section (ex: "CPSC 110 101").
+
+        Returns:
+            float: The interval in seconds.
+        """
+        if self._total_weight is None:
+            self._total_weight = sum(
+                self.get_weight(state) for state in self.sections.values()
+            )
+        budget = self.request_budget * self.get_calendar_factor()
+        # Intervals inversely proportional to weight, summing to the budget
+        interval = self._total_weight / (budget * self.get_weight(self.sections[section]))
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _schedule(self, section, due):
+        state = self.sections[section]
+        state.next_due = due
+        state.version = next(self._versions)
+        heapq.heappush(self._heap, (due, state.version, section))
+
+    def update_watchers(self, watcher_index):
+        """
+        Syncs the tracked sections with the current watchers. New sections are due
+        immediately, sections nobody watches anymore are dropped.
+
+        Args:
+            watcher_index (dict): The set of watcher emails, keyed by section.
+        """
+        self._total_weight = None
+        for section in set(self.sections) - set(watcher_index):
+            del self.sections[section]
+        for section, watchers in watcher_index.items():
+            if section in self.sections:
+                self.sections[section].watchers = len(watchers)
+            else:
+                self.sections[section] = SectionState(len(watchers))
+                self._schedule(section, self.clock())
+
+    def record(self, section, seats):
+        """
+        Records a poll result and schedules the next poll of the section.
+
+        Args:
+            section (str): The section (ex: "CPSC 110 101").
+            seats (dict): Its seat availability.
+        """
+        state = self.sections.get(section)
+        if state is None:
+            return
+        if is_closed_result(seats):
+            # No counts to compare, the last known ones are kept
+            snapshot = state.last_seats
+        else:
+            snapshot = SeatSnapshot.from_dict(seats)
+        if state.last_seats is not None and snapshot is not state.last_seats:
+            change = abs(snapshot.registered - state.last_seats.registered) + abs(
+                snapshot.total - state.last_seats.total
+            )
+            state.volatility = (
+                self.volatility_decay * change
+                + (1 - self.volatility_decay) * state.volatility
+            )
+        state.last_seats = snapshot
+        self._schedule(section, self.clock() + self.get_interval(section))
+
+    def defer(self, section):
+        """
+        Schedules the next poll of a section whose last poll produced no result.
+        """
+        if section in self.sections:
+            self._schedule(section, self.clock() + self.get_interval(section))
+
+    def pop_due(self):
+        """
+        Removes and returns every section due for a poll.
+
+        Returns:
+            list: The due sections, most overdue first.
+        """
+        now = self.clock()
+        self._total_weight = None
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, version, section = heapq.heappop(self._heap)
+            state = self.sections.get(section)
+            # Skip entries superseded by a later schedule or a dropped section
+            if state is not None and state.version == version:
+                due.append(section)
+        return due
+
+    def get_next_due(self):
+        """
+        Returns:
+            float: When the next section is due, on the scheduler clock, or None.
+        """
+        while self._heap:
+            due, version, section = self._heap[0]
+            state = self.sections.get(section)
+            if state is not None and state.version == version:
+                return due
+            heapq.heappop(self._heap)
+        return None
@@ -0,0 +1,251 @@
+import math
+import os
+import socket
+import zlib
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from config import cfg
+
+
+def get_shard(section, num_shards):
+    """
+    Maps a section to its shard. Stable across processes and restarts.
+
+    Args:
+        section (str): The section (ex: "CPSC 110 101").
+        num_shards (int): The number of shards.
+
+    Returns:
+        int: The shard number.
+    """
+    return zlib.crc32(section.encode()) % num_shards
+
+
+class ShardLeaseManager:
+    """
+    Splits the tracked sections between poller nodes through lease documents in
+    MongoDB.
+
+    Every node heartbeats a document in the nodes collection, and claims up to its
+    fair share of shards (shards / live nodes) by taking over leases that are free
+    or expired. A node only polls sections of shards whose lease it holds with some
+    margin left, so no section is polled by two nodes, and the shards of a dead node
+    are taken over as soon as their leases expire.
+
+    Works with any pymongo-compatible client, including mongomock.
+    """
+
+    def __init__(
+        self,
+        client,
+        node_id=None,
+        num_shards=cfg.SHARD_COUNT,
+        lease_ttl=cfg.SHARD_LEASE_TTL,
+        safety_margin=None,
+        clock=datetime.utcnow,
+    ):
+        """
+        Args:
+            client: The MongoDB client object.
+            node_id (str, optional): Unique name of this node. Defaults to host-pid.
+            num_shards (int, optional): The number of shards.
+            lease_ttl (float, optional): Seconds a lease or node heartbeat stays valid.
+            safety_margin (float, optional): Seconds before expiry at which this node
+                stops polling a shard. Defaults to a fifth of lease_ttl.
+            clock (callable, optional): Returns the current UTC datetime.
+        """
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.num_shards = num_shards
+        self.lease_ttl = timedelta(seconds=lease_ttl)
+        self.safety_margin = timedelta(
+            seconds=lease_ttl / 5 if safety_margin is None else safety_margin
+        )
+        self.clock = clock
+
+        db = client[cfg.POLLER_DB]
+        self.leases = db[cfg.SHARD_LEASE_TABLE]
+        self.nodes = db[cfg.POLLER_NODE_TABLE]
+
+        # Lease expiry of each shard held by this node
+        self.owned = {}
+
+    @property
+    def heartbeat_interval(self):
+        return self.lease_ttl.total_seconds() / 3
+
+    def heartbeat(self):
+        """
+        Renews this node's heartbeat and leases, then releases or claims shards to
+        converge on a fair share. Call at least every heartbeat_interval seconds.
+
+        Returns:
+            set: The shards held by this node.
+        """
+        now = self.clock()
+        expires_at = now + self.lease_ttl
+        self.nodes.update_one(
+            {"_id": self.node_id}, {"$set": {"expires_at": expires_at}}, upsert=True
+        )
+        live_nodes = self.nodes.count_documents({"expires_at": {"$gt": now}})
+        fair_share = math.ceil(self.num_shards / max(live_nodes, 1))
+
+        # Renew held leases; a lease that was taken over is dropped
+        for shard in list(self.owned):
+            result = self.leases.update_one(
+                {"_id": shard, "owner": self.node_id},
+                {"$set": {"expires_at": expires_at}},
+            )
+            if result.matched_count:
+                self.owned[shard] = expires_at
+            else:
+                del self.owned[shard]
+
+        # Hand back shards above the fair share, so new nodes can pick them up
+        for shard in sorted(self.owned)[fair_share:]:
+            self.release(shard)
+
+        for shard in range(self.num_shards):
+            if len(self.owned) >= fair_share:
+                break
+            if shard not in self.owned and self._claim(shard, now, expires_at):
+                self.owned[shard] = expires_at
+
+        return set(self.owned)
+
+    def _claim(self, shard, now, expires_at):
+        try:
+            self.leases.update_one(
+                {
+                    "_id": shard,
+                    "$or": [{"owner": None}, {"expires_at": {"$lte": now}}],
+                },
+                {"$set": {"owner": self.node_id, "expires_at": expires_at}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The lease exists and is held by a live node
+            return False
+        # Read back rather than trusting the upsert's returned document, which
+        # some clients (ex: mongomock) leave empty when inserting
+        lease = self.leases.find_one({"_id": shard}, {"owner": True})
+        return lease is not None and lease.get("owner") == self.node_id
+
+    def release(self, shard):
+        self.owned.pop(shard, None)
+        self.leases.update_one(
+            {"_id": shard, "owner": self.node_id},
+            {"$set": {"owner": None, "expires_at": self.clock()}},
+        )
+
+    def release_all(self):
+        """
+        Releases every lease and the node heartbeat, for a clean shutdown.
+        """
+        for shard in list(self.owned):
+            self.release(shard)
+        self.nodes.delete_one({"_id": self.node_id})
+
+    def owns(self, section):
+        """
+        Checks whether this node may poll a section right now.
+
+        Args:
+            section (str): The section (ex: "CPSC 110 101").
+
+        Returns:
+            bool: True if the section's shard lease is held with margin to spare.
+        """
+        expires_at = self.owned.get(get_shard(section, self.num_shards))
+        return expires_at is not None and self.clock() < expires_at - self.safety_margin
+
+    def filter_sections(self, sections):
+        return [section for section in sections if self.owns(section)]
+
+
+def check_lease_takeover(client, num_shards=8, lease_ttl=15):
+    """
+    Runs two nodes through claiming, fair-share rebalancing and the takeover of a
+    dead node's shards, on a simulated clock.
+
+    Args:
+        client: A MongoDB client whose poller database may be cleared (ex: mongomock).
+        num_shards (int, optional): The number of shards.
+        lease_ttl (float, optional): Seconds a lease stays valid.
+
+    Returns:
+        list: The problems found, empty if every step converged.
+    """
+    client[cfg.POLLER_DB][cfg.SHARD_LEASE_TABLE].delete_many({})
+    client[cfg.POLLER_DB][cfg.POLLER_NODE_TABLE].delete_many({})
+    now = [datetime(2024, 1, 1)]
+    nodes = {
+        name: ShardLeaseManager(
+            client, node_id=name, num_shards=num_shards, lease_ttl=lease_ttl,
+            clock=lambda: now[0],
+        )
+        for name in ("a", "b")
+    }
+    all_shards = set(range(num_shards))
+    problems = []
+
+    def check_owners(step, expected):
+        owners = {
+            lease["_id"]: lease.get("owner")
+            for lease in client[cfg.POLLER_DB][cfg.SHARD_LEASE_TABLE].find()
+        }
+        for name, node in nodes.items():
+            for shard in node.owned:
+                if owners.get(shard) != name:
+                    problems.append(
+                        f"{step}: {name} polls shard {shard} owned by {owners.get(shard)}"
+                    )
+        held = set().union(*(set(node.owned) for node in expected))
+        if held != all_shards:
+            problems.append(f"{step}: shards {sorted(all_shards - held)} are not polled")
+
+    # A lone node claims every shard
+    nodes["a"].heartbeat()
+    check_owners("claim", [nodes["a"]])
+
+    # A second node joins: the first hands back the shards above its fair share
+    nodes["b"].heartbeat()
+    nodes["a"].heartbeat()
+    nodes["b"].heartbeat()
+    check_owners("rebalance", [nodes["a"], nodes["b"]])
+    if set(nodes["a"].owned) & set(nodes["b"].owned):
+        problems.append("rebalance: a shard is held by both nodes")
+    fair_share = math.ceil(num_shards / 2)
+    for name, node in nodes.items():
+        if len(node.owned) > fair_share:
+            problems.append(f"rebalance: {name} holds more than its fair share")
+
+    # The first node dies: the second only takes its shards over once the leases expire
+    nodes["a"].owned = {}
+    now[0] += timedelta(seconds=lease_ttl / 2)
+    if len(nodes["b"].heartbeat()) > fair_share:
+        problems.append("takeover: b took over leases that had not expired")
+    now[0] += timedelta(seconds=lease_ttl)
+    nodes["b"].heartbeat()
+    check_owners("takeover", [nodes["b"]])
+    return problems
+
+
+if __name__ == "__main__":
+    # Usage: python sharding.py [mongo uri], against mongomock by default
+    import sys
+
+    if len(sys.argv) > 1:
+        import pymongo
+
+        client = pymongo.MongoClient(sys.argv[1])
+    else:
+        import mongomock
+
+        client = mongomock.MongoClient()
+    problems = check_lease_takeover(client)
+    for problem in problems:
+        print(problem)
+    print("Lease takeover converged" if not problems else f"{len(problems)} problem(s)")
+    sys.exit(1 if problems else 0)
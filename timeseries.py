@@ -0,0 +1,385 @@
+import os
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timezone
+
+from pymongo.errors import CollectionInvalid
+
+from config import cfg
+from models import SeatSnapshot, is_closed_result
+from parsers import SEAT_LABELS
+
+
+def zigzag(value):
+    """
+    Maps signed integers to unsigned ones so small negatives stay small
+    (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...).
+    """
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def write_varint(out, value):
+    """
+    Appends an unsigned integer to a bytearray, 7 bits per byte.
+    """
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """
+    Reads an unsigned integer written by write_varint.
+
+    Returns:
+        tuple: The integer and the position right after it.
+    """
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_columns(rows):
+    """
+    Encodes (timestamp, *seats) rows column by column, each value as the zigzag
+    varint delta from the previous row. Seat counts rarely move by more than a
+    few seats between change points, so most values take a single byte.
+
+    Args:
+        rows (list): Rows of integers, all of the same length.
+
+    Returns:
+        bytearray: The encoded columns.
+    """
+    out = bytearray()
+    for column in zip(*rows):
+        previous = 0
+        for value in column:
+            write_varint(out, zigzag(value - previous))
+            previous = value
+    return out
+
+
+def decode_columns(data, num_rows, num_columns, pos=0):
+    """
+    Decodes rows written by encode_columns.
+
+    Returns:
+        list: The rows, as tuples.
+    """
+    columns = []
+    for _ in range(num_columns):
+        column = []
+        value = 0
+        for _ in range(num_rows):
+            delta, pos = read_varint(data, pos)
+            value += unzigzag(delta)
+            column.append(value)
+        columns.append(column)
+    return list(zip(*columns))
+
+
+def _to_timestamp(when):
+    if when is None:
+        return None
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return int(when.timestamp())
+    return int(when)
+
+
+class SeatHistory(ABC):
+    """
+    Base class of the seat availability stores. Keeps the last stored seats of
+    every section, so a poll result is only written when it differs. The history
+    of a section is therefore the list of points where its seats changed.
+
+    After a restart, the first result of every section is written again.
+    """
+
+    def __init__(self):
+        self.last_seats = {}
+
+    def append(self, section, seats, timestamp=None):
+        """
+        Records a poll result if the seats changed since the last one.
+
+        Args:
+            section (str): The section (ex: "CPSC 110 101").
+            seats (dict): Its seat availability.
+            timestamp (datetime or int, optional): When it was polled, as a UTC
+                datetime or epoch seconds. Defaults to now.
+
+        Returns:
+            bool: Whether the result was written.
+        """
+        if is_closed_result(seats):
+            # Closed on its course page: the last known counts, without general seats
+            last = self.last_seats.get(section)
+            if last is None:
+                return False
+            values = last.close()
+        else:
+            values = SeatSnapshot.from_dict(seats)
+        if self.last_seats.get(section) == values:
+            return False
+        self.last_seats[section] = values
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc)
+        self._write(section, _to_timestamp(timestamp), values)
+        return True
+
+    @abstractmethod
+    def _write(self, section, timestamp, values):
+        """
+        Stores a change point, as epoch seconds and the SeatSnapshot values.
+        """
+
+    def flush(self):
+        pass
+
+    def flush_if_due(self):
+        """
+        Flushes if the store wants its buffer written now. Called once per poll
+        cycle, while flush is called on shutdown.
+        """
+        self.flush()
+
+    def get_section_history(self, section, start=None, end=None):
+        """
+        Retrieves the change points of a section between start (inclusive) and end
+        (exclusive).
+
+        Args:
+            section (str): The section (ex: "CPSC 110 101").
+            start (datetime or int, optional): Start of the range.
+            end (datetime or int, optional): End of the range.
+
+        Returns:
+            list: (UTC datetime, seats dict) pairs, oldest first.
+        """
+        dept = section.split()[0]
+        return self.get_department_history(dept, start, end, sections={section}).get(
+            section, []
+        )
+
+    @abstractmethod
+    def get_department_history(self, dept, start=None, end=None, sections=None):
+        """
+        Retrieves the change points of every section of a department between start
+        (inclusive) and end (exclusive).
+
+        Args:
+            dept (str): The department (ex: "CPSC").
+            start (datetime or int, optional): Start of the range.
+            end (datetime or int, optional): End of the range.
+            sections (set, optional): Only return these sections.
+
+        Returns:
+            dict: (UTC datetime, seats dict) pairs, oldest first, keyed by section.
+        """
+
+    @staticmethod
+    def _make_point(timestamp, values):
+        return (
+            datetime.fromtimestamp(timestamp, timezone.utc),
+            SeatSnapshot(*values).to_dict(),
+        )
+
+
+class LocalSeatHistory(SeatHistory):
+    """
+    Seat history kept in one append-only file per department.
+
+    Changes are buffered and written on flush as one chunk per section. A chunk
+    is a small header (section, row count, time range, payload size) followed by
+    the delta-encoded timestamp and seat columns, so range queries skip chunks
+    outside the range, or of other sections, without decoding them.
+
+    The buffer is kept across poll cycles, until it holds max_rows rows or is
+    max_age seconds old, so that chunks hold many rows and the header and first
+    absolute values are paid once per chunk. Buffered rows are included in
+    queries, but are lost if the process is killed before flushing.
+    """
+
+    def __init__(
+        self,
+        directory=cfg.HISTORY_DIR,
+        max_rows=cfg.HISTORY_FLUSH_ROWS,
+        max_age=cfg.HISTORY_FLUSH_INTERVAL,
+    ):
+        """
+        Args:
+            directory (str, optional): Where the department files are written.
+            max_rows (int, optional): Buffered rows that trigger a flush.
+            max_age (float, optional): Seconds after which the buffer is flushed.
+        """
+        super().__init__()
+        self.directory = directory
+        self.max_rows = max_rows
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+        self._buffer = {}
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+
+    def get_path(self, dept):
+        return os.path.join(self.directory, f"{dept}.seats")
+
+    def _write(self, section, timestamp, values):
+        self._buffer.setdefault(section, []).append((timestamp, *values))
+        self._buffered_rows += 1
+
+    def flush_if_due(self):
+        if (
+            self._buffered_rows >= self.max_rows
+            or time.monotonic() - self._last_flush >= self.max_age
+        ):
+            self.flush()
+
+    def flush(self):
+        """
+        Appends the buffered changes to the department files.
+        """
+        chunks = {}
+        for section, rows in self._buffer.items():
+            payload = encode_columns(rows)
+            chunk = bytearray()
+            name = section.encode()
+            write_varint(chunk, len(name))
+            chunk += name
+            write_varint(chunk, len(rows))
+            write_varint(chunk, rows[0][0])
+            write_varint(chunk, rows[-1][0])
+            write_varint(chunk, len(payload))
+            chunk += payload
+            chunks.setdefault(section.split()[0], bytearray()).extend(chunk)
+        for dept, data in chunks.items():
+            with open(self.get_path(dept), "ab") as outfile:
+                outfile.write(data)
+        self._buffer = {}
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+
+    def get_department_history(self, dept, start=None, end=None, sections=None):
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        path = self.get_path(dept)
+        data = b""
+        if os.path.exists(path):
+            with open(path, "rb") as infile:
+                data = infile.read()
+
+        history = {}
+        pos = 0
+        while pos < len(data):
+            name_length, pos = read_varint(data, pos)
+            section = data[pos : pos + name_length].decode()
+            pos += name_length
+            num_rows, pos = read_varint(data, pos)
+            first, pos = read_varint(data, pos)
+            last, pos = read_varint(data, pos)
+            payload_length, pos = read_varint(data, pos)
+            payload_end = pos + payload_length
+
+            wanted = sections is None or section in sections
+            in_range = (start is None or last >= start) and (end is None or first < end)
+            if wanted and in_range:
+                rows = decode_columns(data, num_rows, 1 + len(SEAT_LABELS), pos)
+                points = history.setdefault(section, [])
+                for timestamp, *values in rows:
+                    if (start is None or timestamp >= start) and (
+                        end is None or timestamp < end
+                    ):
+                        points.append(self._make_point(timestamp, values))
+            pos = payload_end
+
+        # Rows not flushed yet are newer than every chunk of their section
+        for section, rows in self._buffer.items():
+            if section.split()[0] != dept or (sections is not None and section not in sections):
+                continue
+            for timestamp, *values in rows:
+                if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                    history.setdefault(section, []).append(
+                        self._make_point(timestamp, values)
+                    )
+        return history
+
+
+class MongoSeatHistory(SeatHistory):
+    """
+    Seat history kept in a MongoDB time-series collection, which stores the
+    points of each section in compressed columnar buckets. Points are buffered
+    and inserted on flush.
+    """
+
+    # Short field names, stored with every point
+    FIELDS = ("total", "registered", "general", "restricted")
+
+    def __init__(self, client):
+        """
+        Args:
+            client: The MongoDB client object.
+        """
+        super().__init__()
+        db = client[cfg.POLLER_DB]
+        try:
+            db.create_collection(
+                cfg.HISTORY_TABLE,
+                timeseries={
+                    "timeField": "ts",
+                    "metaField": "section",
+                    "granularity": "minutes",
+                },
+            )
+        except CollectionInvalid:
+            # Already created by an earlier run
+            pass
+        self.collection = db[cfg.HISTORY_TABLE]
+        self.collection.create_index([("section.dept", 1), ("ts", 1)])
+        self._buffer = []
+
+    def _write(self, section, timestamp, values):
+        self._buffer.append(
+            {
+                "ts": datetime.fromtimestamp(timestamp, timezone.utc),
+                "section": {"id": section, "dept": section.split()[0]},
+                **dict(zip(self.FIELDS, values)),
+            }
+        )
+
+    def flush(self):
+        if self._buffer:
+            self.collection.insert_many(self._buffer, ordered=False)
+            self._buffer = []
+
+    def get_department_history(self, dept, start=None, end=None, sections=None):
+        query = {"section.dept": dept}
+        if sections is not None:
+            query["section.id"] = {"$in": list(sections)}
+        time_range = {}
+        if start is not None:
+            time_range["$gte"] = datetime.fromtimestamp(_to_timestamp(start), timezone.utc)
+        if end is not None:
+            time_range["$lt"] = datetime.fromtimestamp(_to_timestamp(end), timezone.utc)
+        if time_range:
+            query["ts"] = time_range
+
+        history = {}
+        for point in self.collection.find(query, {"_id": False}).sort("ts", 1):
+            values = [point.get(field, 0) for field in self.FIELDS]
+            timestamp = point["ts"].replace(tzinfo=timezone.utc).timestamp()
+            history.setdefault(point["section"]["id"], []).append(
+                self._make_point(timestamp, values)
+            )
+        return history
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import mmap
+import os
+import zlib
+from urllib.parse import urlparse
+
+import requests
+
+from cache import normalize_url
+
+# Validators dropped when recording, so that every page is archived in full
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+# Response headers kept in the archive
+ARCHIVED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class Response:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class ReplayMissError(Exception):
+    """Raised when a replayed sweep requests a URL that was never recorded."""
+
+
+def get_archive_key(url):
+    """
+    Keys archived pages by path and normalized query only, so a sweep recorded
+    against one host can be replayed against another.
+    """
+    parsed = urlparse(f"//{normalize_url(url)}")
+    return f"{parsed.path}?{parsed.query}"
+
+
+class LiveTransport:
+    """
+    Sends requests to SSC. The default transport.
+    """
+
+    # Whether requests go over the network, and should go through the rate limiter
+    remote = True
+
+    # trace is a dict the transport may fill with phase timings (ex: "ttfb")
+    def fetch(self, url, headers, trace=None):
+        response = requests.get(url, headers=headers)
+        if trace is not None:
+            # Time until the response headers were parsed
+            trace["ttfb"] = response.elapsed.total_seconds()
+        return Response(response.status_code, response.headers, response.content)
+
+    async def async_fetch(self, session, url, headers, trace=None):
+        async with session.get(url, headers=headers, trace_request_ctx=trace) as response:
+            # The body of a 304 is empty, reading it costs nothing
+            body = await response.read()
+            return Response(response.status, response.headers, body)
+
+    def close(self):
+        pass
+
+
+class RecordingTransport(LiveTransport):
+    """
+    Sends requests to SSC and writes every successful response to an archive.
+
+    The archive is a directory holding blobs.bin, the zlib-compressed page bodies
+    stored once per distinct content (keyed by SHA-256), and index.json, mapping
+    each URL to its blob, status and headers. The index is written on close.
+    """
+
+    def __init__(self, path, inner=None):
+        """
+        Args:
+            path (str): The archive directory. An existing archive is added to.
+            inner (LiveTransport, optional): The transport the requests go through.
+        """
+        self.path = path
+        self.inner = inner or LiveTransport()
+        os.makedirs(path, exist_ok=True)
+        self.index = _load_index(path)
+        self._blobs = open(os.path.join(path, "blobs.bin"), "ab")
+
+    def _record(self, url, response):
+        if response.status != 200:
+            return
+        digest = hashlib.sha256(response.body).hexdigest()
+        blobs = self.index["blobs"]
+        if digest not in blobs:
+            data = zlib.compress(response.body, 6)
+            blobs[digest] = [self._blobs.tell(), len(data)]
+            self._blobs.write(data)
+        self.index["pages"][get_archive_key(url)] = {
+            "blob": digest,
+            "status": response.status,
+            "headers": {
+                name: response.headers[name]
+                for name in ARCHIVED_HEADERS
+                if response.headers.get(name) is not None
+            },
+        }
+
+    @staticmethod
+    def _strip_validators(headers):
+        return {
+            name: value for name, value in headers.items() if name not in CONDITIONAL_HEADERS
+        }
+
+    def fetch(self, url, headers, trace=None):
+        response = self.inner.fetch(url, self._strip_validators(headers), trace)
+        self._record(url, response)
+        return response
+
+    async def async_fetch(self, session, url, headers, trace=None):
+        response = await self.inner.async_fetch(
+            session, url, self._strip_validators(headers), trace
+        )
+        self._record(url, response)
+        return response
+
+    def close(self):
+        """
+        Flushes the blobs and writes the index.
+        """
+        self._blobs.flush()
+        tmp_path = os.path.join(self.path, "index.json.tmp")
+        with open(tmp_path, "w") as outfile:
+            json.dump(self.index, outfile)
+        os.replace(tmp_path, os.path.join(self.path, "index.json"))
+        self.inner.close()
+
+
+class ReplayTransport:
+    """
+    Serves the pages of an archive written by RecordingTransport, without any
+    network access. The blobs file is memory-mapped, so only the pages that are
+    requested are read and decompressed.
+    """
+
+    remote = False
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The archive directory.
+        """
+        self.path = path
+        self.index = _load_index(path)
+        self._file = open(os.path.join(path, "blobs.bin"), "rb")
+        # mmap can't map an empty file
+        self._blobs = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.fstat(self._file.fileno()).st_size
+            else b""
+        )
+
+    def fetch(self, url, headers, trace=None):
+        page = self.index["pages"].get(get_archive_key(url))
+        if page is None:
+            raise ReplayMissError(f"URL not in the archive: {url}")
+        offset, length = self.index["blobs"][page["blob"]]
+        body = zlib.decompress(self._blobs[offset : offset + length])
+        headers = dict(page["headers"], **{"Content-Length": str(length)})
+        return Response(page["status"], headers, body)
+
+    async def async_fetch(self, session, url, headers, trace=None):
+        return self.fetch(url, headers, trace)
+
+    def close(self):
+        if isinstance(self._blobs, mmap.mmap):
+            self._blobs.close()
+        self._file.close()
+
+
+def _load_index(path):
+    index_path = os.path.join(path, "index.json")
+    if os.path.exists(index_path):
+        with open(index_path) as infile:
+            return json.load(infile)
+    return {"pages": {}, "blobs": {}}
+
+
+def make_transport(mode="live", path=None):
+    """
+    Creates the transport for a mode.
+
+    Args:
+        mode (str, optional): "live", "record" or "replay". Defaults to "live".
+        path (str, optional): The archive directory, required to record or replay.
+
+    Returns:
+        The transport.
+    """
+    if mode == "live":
+        return LiveTransport()
+    if path is None:
+        raise ValueError(f"An archive path is required to {mode}")
+    if mode == "record":
+        return RecordingTransport(path)
+    if mode == "replay":
+        return ReplayTransport(path)
+    raise ValueError(f"Unknown transport mode {mode!r}, expected live, record or replay")